@@ -1,5 +1,7 @@
-import re
 import os
+import re
+import time
+import functools
 import ui
 import api
 import wx
@@ -11,13 +13,75 @@ import characterProcessing
 import languageHandler
 import scriptHandler
 from scriptHandler import script
+from logHandler import log
+from . import backgroundTasks
+from . import changeWatch
+from . import fileRules
+from . import folderIndex
+from . import folderWalk
+from . import mergedNotes
+from . import noteArchives
+from . import noteBuffer
+from . import noteCache
+from . import noteCatalog
+from . import noteDiff
+from . import noteFinder
+from . import noteFollow
+from . import noteGrep
+from . import noteOutline
+from . import notePositions
+from . import noteReader
+from . import noteSort
+from . import prefetch
+from . import searchIndex
+from . import session
+from . import symbolCache
+from . import textEncoding
+from . import tracing
+from . import wordIndex
+
+DEFAULT_OPTIONS = {
+	# number of notes on either side of the current one to load in the background
+	"prefetchDistance": 1,
+	# memory budget of the cache of recently visited notes, in megabytes
+	"noteCacheMegabytes": 64,
+	# regular expression for extra lines to treat as headings, such as log timestamps
+	"outlineMarker": "",
+	# how many levels of subfolders to list notes from, 0 for only the folder itself
+	"subfolderDepth": 0,
+	# comma separated names of subfolders never to look in
+	"skipFolders": ".git,node_modules",
+	# 1 to list the notes in zip archives as if each archive were a subfolder, 0 to leave archives out
+	"readArchives": 1,
+	# milliseconds between checks for lines appended to a followed note, 0 to check only on request
+	"followInterval": 1000,
+	# 1 to announce the lines appended to a followed note as they arrive, 0 to add them silently
+	"announceNewLines": 1,
+	# how changes to the open note and the configured folders are noticed: "poll" to compare stat
+	# results, checking less often while nothing changes, or "off" not to watch for changes
+	"watchBackend": "poll",
+	# matches after which a regular expression search of all folders stops
+	"grepMaxHits": 500,
+	# 1 to follow the name of each note moved to with its line and word counts, when already counted
+	"announceStatistics": 0,
+	# 1 to open each note where it was left, with its selection markers, 0 to always open notes at the top
+	"rememberPositions": 1,
+}
+
+# milliseconds changed positions and bookmarks wait to be saved, so moving through notes writes them once
+POSITIONS_SAVE_DELAY = 3000
+# seconds a walk of subfolders may take before the notes found so far are shown
+DISCOVERY_GRACE = 0.25
+# more lines than this appended at once are announced as a count
+MAX_ANNOUNCED_LINES = 5
 
 
 class SettingsDialog(wx.Dialog):
-	def __init__(self, parent, paths, file_types):
+	def __init__(self, parent, paths, file_types, rules):
 		super().__init__(parent, title=_("Invisinote settings"))
 		self._paths = list(paths)
 		self._file_types = list(file_types)
+		self._rules = list(rules)
 		main_sizer = wx.BoxSizer(wx.VERTICAL)
 
 		paths_box = wx.StaticBoxSizer(wx.StaticBox(self, label=_("Folders")), wx.VERTICAL)
@@ -42,6 +106,17 @@ class SettingsDialog(wx.Dialog):
 		types_box.Add(types_btn_sizer, flag=wx.ALL, border=5)
 		main_sizer.Add(types_box, proportion=1, flag=wx.EXPAND | wx.ALL, border=5)
 
+		rules_box = wx.StaticBoxSizer(wx.StaticBox(self, label=_("Include and exclude rules")), wx.VERTICAL)
+		self._rules_listbox = wx.ListBox(self, choices=self._rules)
+		rules_box.Add(self._rules_listbox, proportion=1, flag=wx.EXPAND | wx.ALL, border=5)
+		rules_btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
+		add_rule_btn = wx.Button(self, label=_("Add rule"))
+		remove_rule_btn = wx.Button(self, label=_("Remove rule"))
+		rules_btn_sizer.Add(add_rule_btn, flag=wx.RIGHT, border=5)
+		rules_btn_sizer.Add(remove_rule_btn)
+		rules_box.Add(rules_btn_sizer, flag=wx.ALL, border=5)
+		main_sizer.Add(rules_box, proportion=1, flag=wx.EXPAND | wx.ALL, border=5)
+
 		main_sizer.Add(self.CreateButtonSizer(wx.OK | wx.CANCEL), flag=wx.ALL, border=5)
 		self.SetSizer(main_sizer)
 		self.Fit()
@@ -49,6 +124,8 @@ class SettingsDialog(wx.Dialog):
 		remove_folder_btn.Bind(wx.EVT_BUTTON, self._on_remove_folder)
 		add_type_btn.Bind(wx.EVT_BUTTON, self._on_add_type)
 		remove_type_btn.Bind(wx.EVT_BUTTON, self._on_remove_type)
+		add_rule_btn.Bind(wx.EVT_BUTTON, self._on_add_rule)
+		remove_rule_btn.Bind(wx.EVT_BUTTON, self._on_remove_rule)
 
 	def _on_add_folder(self, event):
 		dlg = wx.DirDialog(self, _("Choose a folder"))
@@ -104,12 +181,51 @@ class SettingsDialog(wx.Dialog):
 					self._types_listbox.SetSelection(min(idx, len(self._file_types) - 1))
 			dlg.Destroy()
 
+	def _on_add_rule(self, event):
+		dlg = wx.TextEntryDialog(
+			self,
+			_("Enter a rule (e.g. exclude *.swp, include README or exclude re:^~):"),
+			_("Add rule"),
+		)
+		if dlg.ShowModal() == wx.ID_OK:
+			rule = dlg.GetValue().strip()
+			try:
+				fileRules.parse_rule(rule)
+			except ValueError as e:
+				wx.MessageBox(str(e), _("Invalid rule"), wx.OK | wx.ICON_ERROR, self)
+			else:
+				if rule not in self._rules:
+					self._rules.append(rule)
+					self._rules_listbox.Append(rule)
+					self._rules_listbox.SetSelection(len(self._rules) - 1)
+		dlg.Destroy()
+
+	def _on_remove_rule(self, event):
+		idx = self._rules_listbox.GetSelection()
+		if idx != wx.NOT_FOUND:
+			rule = self._rules[idx]
+			dlg = wx.MessageDialog(
+				self,
+				_("Remove rule: {}?").format(rule),
+				_("Confirm removal"),
+				wx.YES_NO | wx.NO_DEFAULT | wx.ICON_WARNING,
+			)
+			if dlg.ShowModal() == wx.ID_YES:
+				self._rules.pop(idx)
+				self._rules_listbox.Delete(idx)
+				if self._rules:
+					self._rules_listbox.SetSelection(min(idx, len(self._rules) - 1))
+			dlg.Destroy()
+
 	def get_paths(self):
 		return list(self._paths)
 
 	def get_file_types(self):
 		return list(self._file_types)
 
+	def get_rules(self):
+		return list(self._rules)
+
 
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 	scriptCategory = _("invisinote")
@@ -117,16 +233,33 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 	def __init__(self):
 		super().__init__()
 		self.notes = []
+		# the listing in name order that notes is sorted from, and the sort mode
+		self.listedNotes = []
+		self.sortMode = "name"
 		self.currentNoteIndex = 0
 		self.currentLineIndex = 0
 		self.currentNoteLines = []
 		self.currentWordIndex = 0
 		self.currentCharIndex = 0
+		self._currentLineText = None
+		self.lineWords = wordIndex.LineWordsCache()
+		self.symbols = symbolCache.SymbolCache(characterProcessing.processSpeechSymbol)
 		self.selectionStart = None
 		self.selectionEnd = None
 		self.paths = []
 		self.currentPathIndex = 0
 		self.notesPath = ""
+		# whether the notes of all folders are browsed together, and their merged listing
+		self.allFolders = False
+		self.allNotes = None
+		# the listing still being added to by a walk of subfolders
+		self._discoveredNotes = None
+		# whether lines appended to the current note are read as it grows, and what reads them
+		self.following = False
+		self.follower = None
+		self._followTimer = None
+		# notices changes to the open note and the configured folders, once the plugin has started
+		self.watcher = None
 		nvdaConfigPath = globalVars.appArgs.configPath
 		scratchpadDir = os.path.join(nvdaConfigPath, "scratchpad")
 		moduleDir = os.path.dirname(os.path.abspath(__file__))
@@ -134,12 +267,84 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			self.configFolder = os.path.join(scratchpadDir, "invisinote")
 		else:
 			self.configFolder = os.path.join(nvdaConfigPath, "invisinote")
-		os.makedirs(self.configFolder, exist_ok=True)
 		self.pathsFile = os.path.join(self.configFolder, "paths.txt")
 		self.fileTypes = []
 		self.fileTypesFile = os.path.join(self.configFolder, "filetypes.txt")
+		self.fileRules = []
+		self.rulesFile = os.path.join(self.configFolder, "rules.txt")
+		self.fileFilter = fileRules.FileFilter(["txt"])
+		self.options = dict(DEFAULT_OPTIONS)
+		self.optionsFile = os.path.join(self.configFolder, "options.txt")
+		self.sessionFile = os.path.join(self.configFolder, "session.json")
+		self.positions = notePositions.PositionStore(os.path.join(self.configFolder, "positions.json"))
+		# the note whose lines are shown, whose position is remembered when another note is shown
+		self._shownNote = None
+		self._positionsTimer = None
+		self._started = False
+		self.tracer = tracing.Tracer()
+		self.tasks = backgroundTasks.TaskRunner()
+		# a regular expression search can run for minutes, so it does not hold up the workers above
+		self.grepTasks = backgroundTasks.TaskRunner(workers=1)
+		self.prefetcher = prefetch.NotePrefetcher(self._prefetch_note)
+		self.folderIndex = folderIndex.FolderIndexStore(os.path.join(self.configFolder, "index"))
+		self.archives = noteArchives.ArchiveStore()
+		self.searchIndex = searchIndex.SearchIndex(
+			self._list_tree_notes, self._read_note_file, self._note_stamps
+		)
+		self.catalog = noteCatalog.NoteCatalog(
+			os.path.join(self.configFolder, "catalog.json"),
+			self._list_tree_notes,
+			self._note_stamps,
+			self._read_archived,
+		)
+		self.noteReader = noteReader.NoteReader()
+		self.nameIndex = None
+		self.outline = None
+		self.searchQuery = ""
+		self.grepPattern = ""
+		self.searchResults = []
+		self.searchResultIndex = 0
+		self.noteCache = noteCache.NoteCache(
+			DEFAULT_OPTIONS["noteCacheMegabytes"] * 1024 * 1024, self._lines_evicted
+		)
+
+	def _ensure_started(self):
+		"""Read the configuration and resume the saved session on the first invisinote gesture.
+
+		Nothing is read at NVDA startup, so unreachable configured folders cannot delay it.
+		"""
+		if self._started:
+			return
+		self._started = True
+		os.makedirs(self.configFolder, exist_ok=True)
 		self._load_paths()
 		self._load_file_types()
+		self._load_rules()
+		self._load_options()
+		self.noteCache.budget = self.options["noteCacheMegabytes"] * 1024 * 1024
+		self.positions.load()
+		self._restore_session()
+		backend = changeWatch.BACKENDS.get(self.options["watchBackend"])
+		if backend is not None:
+			self.watcher = backend(lambda path: wx.CallAfter(self._path_changed, path))
+			self._update_watch()
+
+	def terminate(self):
+		self._stop_following()
+		if self.watcher is not None:
+			self.watcher.stop()
+		self.tasks.shutdown()
+		self.grepTasks.shutdown()
+		self.prefetcher.stop()
+		if self._started:
+			self._save_session()
+			self.folderIndex.flush()
+		self.noteCache.clear()
+		self.symbols.clear()
+		if isinstance(self.currentNoteLines, noteBuffer.PagedLines):
+			self.currentNoteLines.close()
+		self.currentNoteLines = []
+		super().terminate()
 
 	def _load_paths(self):
 		defaultPath = os.path.join(self.configFolder, "notes")
@@ -150,11 +355,140 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			self.paths = [line.strip() for line in f if line.strip()]
 		if not self.paths:
 			self.paths = [defaultPath]
-		for path in self.paths:
-			os.makedirs(path, exist_ok=True)
+		self.tasks.submit("folders", self._make_folders, None, list(self.paths))
 		self.currentPathIndex = 0
 		self.notesPath = self.paths[0]
 
+	def _session_snapshot(self):
+		return {
+			"folder": self.notesPath,
+			"note": self.notes[self.currentNoteIndex] if self.notes else None,
+			"line": self.currentLineIndex,
+			"char": self.currentCharIndex,
+			"allFolders": self.allFolders,
+			"sortMode": self.sortMode,
+		}
+
+	def _save_session(self):
+		session.save(self.sessionFile, self._session_snapshot())
+		self._remember_position()
+		if self._positionsTimer is not None:
+			self._positionsTimer.Stop()
+			self._positionsTimer = None
+		positions = self.positions.snapshot()
+		if positions is not None:
+			notePositions.save(self.positions.positionsFile, positions)
+
+	def _save_session_later(self):
+		self.tasks.submit("session", session.save, None, self.sessionFile, self._session_snapshot())
+		if self.positions.dirty and self._positionsTimer is None:
+			self._positionsTimer = wx.CallLater(POSITIONS_SAVE_DELAY, self._save_positions)
+
+	def _save_positions(self):
+		self._positionsTimer = None
+		positions = self.positions.snapshot()
+		if positions is not None:
+			self.tasks.submit("positions", notePositions.save, None, self.positions.positionsFile, positions)
+
+	def _restore_session(self):
+		"""Put back the folder, note and position saved by the last session.
+
+		The note listing comes from the saved folder index, so the folder itself is not rescanned; the
+		note is reloaded in the background. Archives are not part of the saved folder index, so the notes
+		in them are added by a walk in the background too.
+		"""
+		snapshot = session.load(self.sessionFile)
+		if snapshot is None or snapshot.get("folder") not in self.paths:
+			return
+		folder = snapshot["folder"]
+		if snapshot.get("sortMode") in noteSort.SORT_MODES:
+			self.sortMode = snapshot["sortMode"]
+		if snapshot.get("allFolders"):
+			listings = [self.folderIndex.cached_notes(path, self.fileFilter) for path in self.paths]
+			notes = mergedNotes.MergedNotes(self.paths, listings) if None not in listings else None
+			self._restore_listing(snapshot, notes)
+			return
+		notes = self._list_tree_notes(folder, self.fileFilter, cached=True, archives=False)
+		restored = self._restore_listing(snapshot, notes)
+		if self.options["readArchives"]:
+			self.tasks.submit(
+				"restore",
+				self._list_tree_notes,
+				lambda notes: self._add_archived(snapshot, restored, notes),
+				folder,
+				self.fileFilter,
+				True,
+			)
+
+	def _restore_listing(self, snapshot, notes):
+		"""Browse notes on the saved note and reload it; return notes, or None if the note is not listed."""
+		path = snapshot.get("note")
+		if not notes or path not in notes:
+			return None
+		folder = snapshot["folder"]
+		self.currentPathIndex = self.paths.index(folder)
+		self.notesPath = folder
+		self._browse(notes)
+		if snapshot.get("allFolders"):
+			self.allFolders = True
+			self.allNotes = notes
+		self.currentNoteIndex = self.notes.index(path)
+		self.tasks.submit(
+			"navigate",
+			self._get_note_lines,
+			lambda lines: self._resume_note(lines, snapshot.get("line", 0), snapshot.get("char", 0)),
+			path,
+			error=self._report_error,
+		)
+		return notes
+
+	def _add_archived(self, snapshot, restored, notes):
+		"""Browse the restored listing again with the notes in its archives, unless another is browsed now."""
+		if restored is None:
+			# the saved note may be in an archive, so it is looked for again unless something was opened
+			if not self.notes:
+				self._restore_listing(snapshot, notes)
+		elif self.listedNotes is restored and notes:
+			self.listedNotes = notes
+			self._resort()
+
+	def _resume_note(self, lines, lineIndex, charIndex):
+		self._show_note_lines(lines, lineIndex)
+		self.currentCharIndex = max(0, min(charIndex, len(self._current_line()) - 1))
+		self._update_word_index_from_char()
+
+	def _remember_position(self):
+		if self._shownNote is not None and self.options["rememberPositions"]:
+			self.positions.remember(
+				self._shownNote,
+				self.currentNoteLines,
+				self.currentLineIndex,
+				self.currentCharIndex,
+				(self.selectionStart, self.selectionEnd),
+			)
+
+	def _show_remembered(self, path, lines):
+		"""Show a note's lines where the note was last left, or from the top."""
+		# the note being left is remembered first, in case it is the one shown again
+		self._remember_position()
+		self._shownNote = None
+		position = None
+		if path is not None and self.options["rememberPositions"]:
+			position = self.positions.last_position(path, lines)
+		if position is None:
+			self._show_note_lines(lines)
+			return
+		(lineIndex, charIndex), selection = position
+		self._resume_note(lines, lineIndex, charIndex)
+		self.selectionStart, self.selectionEnd = selection
+
+	def _make_folders(self, paths):
+		for path in paths:
+			try:
+				os.makedirs(path, exist_ok=True)
+			except OSError:
+				pass
+
 	def _load_file_types(self):
 		if not os.path.exists(self.fileTypesFile):
 			with open(self.fileTypesFile, "w", encoding="utf-8") as f:
@@ -164,67 +498,440 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		if not self.fileTypes:
 			self.fileTypes = ["txt"]
 
-	def _read_note_file(self, path):
-		try:
-			with open(path, "r", encoding="utf-8") as f:
-				return f.read()
-		except UnicodeDecodeError:
-			with open(path, "r", encoding="latin-1") as f:
-				return f.read()
-
-	def _load_notes(self):
-		if not os.path.isdir(self.notesPath):
-			return _("Folder not found")
-		self.notes = sorted(
-			os.path.join(self.notesPath, f)
-			for f in os.listdir(self.notesPath)
-			if any(f.endswith("." + ext) for ext in self.fileTypes)
+	def _load_rules(self):
+		self.fileRules = []
+		if os.path.exists(self.rulesFile):
+			with open(self.rulesFile, "r", encoding="utf-8") as f:
+				for line in f:
+					try:
+						fileRules.parse_rule(line)
+					except ValueError:
+						continue
+					self.fileRules.append(line.strip())
+		self.fileFilter = fileRules.FileFilter(self.fileTypes, self.fileRules)
+
+	def _load_options(self):
+		if not os.path.exists(self.optionsFile):
+			return
+		with open(self.optionsFile, "r", encoding="utf-8") as f:
+			for line in f:
+				key, sep, value = line.partition("=")
+				key = key.strip()
+				if not sep or key not in DEFAULT_OPTIONS:
+					continue
+				try:
+					self.options[key] = type(DEFAULT_OPTIONS[key])(value.strip())
+				except ValueError:
+					pass
+
+	def _read_note_file(self, path, stamp):
+		if self.archives.is_member(path):
+			text, _encoding = textEncoding.decode(self.archives.read_member(path))
+			if self.tracer.enabled:
+				self.tracer.count_bytes(stamp[1])
+			return text
+		# the folder index remembers each note's encoding so it is only detected once
+		text, encoding = textEncoding.read_text(path, self.folderIndex.get_encoding(path, stamp))
+		self.folderIndex.set_encoding(path, stamp, encoding)
+		if self.tracer.enabled:
+			self.tracer.count_bytes(stamp[1])
+		return text
+
+	def _report_error(self, exception):
+		if not isinstance(exception, OSError):
+			raise exception
+		ui.message(exception.strerror or str(exception))
+
+	def _walk_folder(self, folder, fileFilter, cached=False, archives=True):
+		skip = {name.strip().lower() for name in self.options["skipFolders"].split(",") if name.strip()}
+		listFolder = self.folderIndex.cached_folder if cached else self.folderIndex.list_folder
+		# archives are not part of the saved folder index, so a cached walk opens them unless told not to
+		listArchive = self.archives.list_notes if self.options["readArchives"] and archives else None
+		return folderWalk.walk_notes(
+			listFolder, folder, fileFilter, self.options["subfolderDepth"], skip, listArchive
 		)
-		if self.notes:
+
+	def _walks_tree(self):
+		"""Whether listing a folder goes beyond the notes directly in it."""
+		return self.options["subfolderDepth"] > 0 or bool(self.options["readArchives"])
+
+	def _list_tree_notes(self, folder, fileFilter, cached=False, archives=True):
+		"""Return the notes of folder, its archives and the subfolders subfolderDepth allows, or None.
+
+		The notes in archives are left out if archives is False.
+		"""
+		if not self._walks_tree():
+			if cached:
+				return self.folderIndex.cached_notes(folder, fileFilter)
+			return self.folderIndex.list_notes(folder, fileFilter)
+		walk = self._walk_folder(folder, fileFilter, cached, archives)
+		first = next(walk, None)
+		if first is None:
+			return None
+		notes = list(first)
+		for batch in walk:
+			notes.extend(batch)
+		return notes
+
+	def _sorted(self, notes):
+		"""notes, a listing in name order, in the current sort mode."""
+		mode = self.sortMode
+		stats = self.folderIndex.stat_table(notes) if noteSort.needs_stats(mode) else None
+		return noteSort.sort_notes(notes, mode, stats, not isinstance(notes, mergedNotes.MergedNotes))
+
+	def _browse(self, notes):
+		"""Browse a listing of notes in name order, sorted in the current sort mode."""
+		self.listedNotes = notes
+		self.notes = self._sorted(notes)
+
+	def _note_at(self, notes, path):
+		"""Return (notes, notes in the sort mode, index of path or 0 in those, lines of that note)."""
+		view = self._sorted(notes)
+		index = view.index(path) if path in view else 0
+		return notes, view, index, self._get_note_lines(view[index])
+
+	def _scan_folder(self, report, folder, fileFilter, path=None):
+		"""List folder, and its archives and subfolders if enabled, and load the note to show first.
+
+		Returns the result of _note_at for the listing and path.
+		"""
+		if self._walks_tree():
+			return self._scan_tree(report, folder, fileFilter, path)
+		notes = self.folderIndex.list_notes(folder, fileFilter)
+		if not notes:
+			return notes, notes, 0, []
+		return self._note_at(notes, path)
+
+	def _scan_tree(self, report, folder, fileFilter, path):
+		"""Walk folder and its subfolders like _scan_folder, showing the first notes of a large tree early.
+
+		If the walk is still going after DISCOVERY_GRACE seconds, the notes found so far are reported as
+		("show", result) and each later folder's notes as ("add", notes), and None is returned.
+		"""
+		walk = self._walk_folder(folder, fileFilter)
+		first = next(walk, None)
+		if first is None:
+			return None, None, 0, []
+		notes = list(first)
+		found = path in notes
+		deadline = time.perf_counter() + DISCOVERY_GRACE
+		shown = False
+		for batch in walk:
+			if shown:
+				if batch and not report(("add", batch)):
+					return None
+				continue
+			notes.extend(batch)
+			found = found or path in batch
+			if notes and (path is None or found) and time.perf_counter() >= deadline:
+				report(("show", self._note_at(notes, path)))
+				shown = True
+		if shown:
+			return None
+		if not notes:
+			return notes, notes, 0, []
+		return self._note_at(notes, path)
+
+	def _list_all_folders(self, folders, fileFilter):
+		listings = [self.folderIndex.list_notes(folder, fileFilter) for folder in folders]
+		return mergedNotes.MergedNotes(folders, listings)
+
+	def _scan_all_folders(self, folders, fileFilter, path=None):
+		notes = self._list_all_folders(folders, fileFilter)
+		if not notes:
+			return notes, notes, 0, []
+		return self._note_at(notes, path)
+
+	def _load_notes(self, prefix="", path=None, lineIndex=0):
+		"""List the current folder, or every folder, in the background and announce the count after prefix.
+
+		If path is given, that note is opened at lineIndex and announced with its line instead.
+		"""
+		self.prefetcher.cancel()
+		if self.allFolders:
+			self.tasks.submit(
+				"navigate",
+				self._scan_all_folders,
+				lambda result: self._show_folder(result, prefix, path, lineIndex),
+				list(self.paths),
+				self.fileFilter,
+				path,
+				error=self._report_error,
+			)
+			return
+		self.tasks.submit_streaming(
+			"navigate",
+			self._scan_folder,
+			lambda item: self._show_discovered(item, prefix, path, lineIndex),
+			lambda result: self._show_folder(result, prefix, path, lineIndex),
+			self.notesPath,
+			self.fileFilter,
+			path,
+			error=self._report_error,
+		)
+
+	def _show_discovered(self, item, prefix, path, lineIndex):
+		kind, value = item
+		if kind == "show":
+			self._show_folder(value, prefix, path, lineIndex, partial=True)
+		elif self.listedNotes is self._discoveredNotes:
+			self.listedNotes.extend(value)
+			if self.notes is not self.listedNotes:
+				# sorted into place once the walk has finished
+				self.notes.extend(value)
+			self.nameIndex = None
+
+	def _show_folder(self, result, prefix, path, lineIndex, partial=False):
+		if result is None:
+			# the walk of subfolders finished after its first notes were shown
+			if self.listedNotes is self._discoveredNotes:
+				if self.notes is not self.listedNotes:
+					self._resort()
+				self.searchIndex.refresh(self.paths, self.fileFilter)
+				self.catalog.refresh(self.paths, self.fileFilter)
+				ui.message(_("{} notes found.").format(len(self.notes)))
+			self._discoveredNotes = None
+			return
+		notes, view, index, lines = result
+		if notes is None:
+			ui.message(prefix + _("Folder not found"))
+			return
+		self.listedNotes = notes
+		self.notes = view
+		self._discoveredNotes = notes if partial else None
+		if isinstance(notes, mergedNotes.MergedNotes):
+			self.allNotes = notes
+		self.searchIndex.refresh(self.paths, self.fileFilter)
+		if not partial:
+			self.catalog.refresh(self.paths, self.fileFilter)
+		self.currentNoteIndex = index
+		if path is None:
+			self._show_remembered(view[index] if view else None, lines)
+		else:
+			self._show_note_lines(lines, lineIndex)
+		self._save_session_later()
+		if path is None and partial:
+			ui.message(prefix + _("{} notes so far, still looking in subfolders.").format(len(notes)))
+		elif path is None:
+			ui.message(prefix + (_("{} notes.").format(len(notes)) if notes else _("No notes")))
+		elif notes and view[index] == path:
+			ui.message(os.path.basename(path) + " " + self._current_line())
+		else:
+			ui.message(_("Note not found, {}").format(os.path.basename(path)))
+
+	def _open_note(self, index, lineIndex=None, announceLine=False):
+		self.currentNoteIndex = index
+		path = self.notes[index]
+		self.tasks.submit(
+			"navigate",
+			self._get_note_lines,
+			lambda lines: self._show_note(path, lines, lineIndex, announceLine),
+			path,
+			error=self._report_error,
+		)
+
+	def _show_note(self, path, lines, lineIndex, announceLine, announce=True):
+		"""Show a note's lines at lineIndex, or where the note was last left if lineIndex is None."""
+		if lineIndex is None:
+			self._show_remembered(path, lines)
+		else:
+			self._show_note_lines(lines, lineIndex)
+		self._save_session_later()
+		if not announce:
+			return
+		message = os.path.basename(path)
+		if announceLine:
+			message += " " + self._current_line()
+		elif self.options["announceStatistics"]:
+			stats = self._catalogued(path)
+			if stats is not None:
+				message += ", " + _("{} lines, {} words").format(stats.lines, stats.words)
+		ui.message(message)
+
+	def _switch_listing(self, notes, message):
+		"""Browse another listing of notes already loaded, staying on the current note if it is listed."""
+		path = self.notes[self.currentNoteIndex] if self.notes else None
+		self.tasks.cancel("navigate")
+		self._browse(notes)
+		notes = self.notes
+		if path is not None and path in notes:
+			self.currentNoteIndex = notes.index(path)
+			self._save_session_later()
+		elif notes:
 			self.currentNoteIndex = 0
-			self._load_current_note_lines()
-			return _("{} notes.").format(len(self.notes))
-		self.currentNoteIndex = 0
-		self.currentNoteLines = []
-		self.currentLineIndex = 0
-		self.currentWordIndex = 0
-		self.currentCharIndex = 0
-		self.selectionStart = None
-		self.selectionEnd = None
-		return _("No notes")
+			self.tasks.submit(
+				"navigate",
+				self._get_note_lines,
+				lambda lines: self._show_note(notes[0], lines, None, False, announce=False),
+				notes[0],
+				error=self._report_error,
+			)
+		else:
+			self.currentNoteIndex = 0
+			self._show_note_lines([])
+		ui.message(message)
+
+	def _filter_folder(self, index):
+		"""Leave the all folders view for one folder, picked out of the merged listing without a rescan.
+
+		The merged listing holds only each folder's own notes, so a folder whose archives and subfolders
+		are listed too is loaded again instead.
+		"""
+		self.allFolders = False
+		self.currentPathIndex = index
+		self.notesPath = self.paths[index]
+		folder = os.path.basename(self.notesPath.rstrip("/\\")) or self.notesPath
+		if self._walks_tree() or self.allNotes is None or self.allNotes.folders != self.paths:
+			self._load_notes(folder + " ")
+			return
+		notes = self.allNotes.listings[index]
+		count = _("{} notes.").format(len(notes)) if notes else _("No notes")
+		self._switch_listing(notes, folder + " " + count)
 
-	def _load_current_note_lines(self):
+	def _show_all_folders(self, notes):
+		self.allNotes = notes
+		self._switch_listing(notes, _("All folders, {} notes.").format(len(notes)))
+
+	def _show_note_lines(self, lines, lineIndex=0):
+		self._remember_position()
+		self._shownNote = self.notes[self.currentNoteIndex] if lines and self.notes else None
+		oldLines = self.currentNoteLines
+		self.currentNoteLines = lines
+		if oldLines is not lines:
+			# an outline still being built belongs to the lines just replaced
+			self.tasks.cancel("outline")
+			if isinstance(oldLines, noteBuffer.PagedLines):
+				self._release_lines(oldLines)
+		self.outline = None
+		self.follower = None
+		self._update_watch()
+		self.lineWords.clear()
 		self.selectionStart = None
 		self.selectionEnd = None
+		self._set_current_line(max(0, min(lineIndex, len(lines) - 1)))
 		if self.notes:
-			content = self._read_note_file(self.notes[self.currentNoteIndex])
-			self.currentNoteLines = content.splitlines(keepends=True)
-			self._set_current_line(0)
-		else:
-			self.currentNoteLines = []
+			self._schedule_prefetch()
+
+	def _lines_evicted(self, lines):
+		if isinstance(lines, noteBuffer.PagedLines):
+			wx.CallAfter(self._release_lines, lines)
+
+	def _release_lines(self, lines):
+		"""Close the file and memory map of a paged note that is neither shown nor cached any more."""
+		if lines is self.currentNoteLines or self.noteCache.stamp_of(lines.path, lines) is not None:
+			return
+		if self.noteReader.path == lines.path:
+			# the reader may still be taking chunks from these lines
+			self.noteReader.stop()
+		lines.close()
+
+	def _note_stamp(self, path):
+		if self.archives.is_member(path):
+			return self.archives.member_stamp(path)
+		st = os.stat(path)
+		return (st.st_mtime_ns, st.st_size)
+
+	def _note_stamps(self, paths):
+		"""Return {path: (mtime_ns, size)} for paths, from the folder index where it lists them.
+
+		Only notes the index does not hold, such as notes in archives, are looked up on disk.
+		"""
+		table = self.folderIndex.stat_table(paths)
+		stamps = {}
+		for path in paths:
+			stat = table.get(path)
+			if stat is not None:
+				stamps[path] = stat[:2]
+				continue
+			try:
+				stamps[path] = self._note_stamp(path)
+			except OSError:
+				pass
+		return stamps
+
+	def _read_note_lines(self, path, stamp):
+		if stamp[1] >= noteBuffer.PAGED_THRESHOLD and not self.archives.is_member(path):
+			encoding = self.folderIndex.get_encoding(path, stamp) or textEncoding.sniff_file(path)
+			if textEncoding.is_ascii_compatible(encoding):
+				self.folderIndex.set_encoding(path, stamp, encoding)
+				if self.tracer.enabled:
+					self.tracer.count_bytes(stamp[1])
+				return noteBuffer.PagedLines(path, encoding)
+		return self._read_note_file(path, stamp).splitlines(keepends=True)
+
+	def _get_note_lines(self, path):
+		stamp = self._note_stamp(path)
+		lines = self.noteCache.lookup(path, stamp)
+		if self.tracer.enabled:
+			self.tracer.count_cache(lines is not None)
+		if lines is None:
+			lines = self._read_note_lines(path, stamp)
+			self.noteCache.store(path, stamp, lines)
+		return lines
+
+	def _prefetch_note(self, path):
+		stamp = self._note_stamp(path)
+		if not self.noteCache.contains(path, stamp):
+			self.noteCache.store(path, stamp, self._read_note_lines(path, stamp))
+
+	def _schedule_prefetch(self):
+		distance = max(0, self.options["prefetchDistance"])
+		paths = []
+		for offset in range(1, distance + 1):
+			for index in (self.currentNoteIndex + offset, self.currentNoteIndex - offset):
+				if 0 <= index < len(self.notes):
+					paths.append(self.notes[index])
+		self.prefetcher.schedule(paths)
+
+	def _open_note_at(self, path, lineIndex):
+		if path in self.notes:
+			self._open_note(self.notes.index(path), lineIndex, announceLine=True)
+			return
+		normPath = os.path.normcase(path)
+		for i, folder in enumerate(self.paths):
+			if normPath.startswith(os.path.normcase(folder.rstrip("/\\")) + os.sep):
+				self.currentPathIndex = i
+				self.notesPath = folder
+				# the merged listing of all folders leaves out the notes of archives and subfolders, so
+				# a note in one of those is opened in its folder's own listing
+				self.allFolders = False
+				self._load_notes(path=path, lineIndex=lineIndex)
+				return
+		ui.message(_("Note not found, {}").format(os.path.basename(path)))
 
 	def _set_current_line(self, index):
 		self.currentLineIndex = index
 		self.currentCharIndex = 0
 		self.currentWordIndex = 0
+		self._currentLineText = None
 
 	def _current_line(self):
-		if self.currentNoteLines and 0 <= self.currentLineIndex < len(self.currentNoteLines):
-			return self.currentNoteLines[self.currentLineIndex].rstrip("\n")
-		return ""
+		# paged notes decode a line on every access, so keep the current one
+		if self._currentLineText is None:
+			if self.currentNoteLines and 0 <= self.currentLineIndex < len(self.currentNoteLines):
+				self._currentLineText = self.currentNoteLines[self.currentLineIndex].rstrip("\n")
+			else:
+				self._currentLineText = ""
+		return self._currentLineText
 
-	def _words_with_indices(self, line):
-		return [(m.group(0), m.start(), m.end()) for m in re.finditer(r"\S+", line)]
+	def _current_line_words(self):
+		return self.lineWords.get(self.currentLineIndex, self._current_line())
 
 	def _update_word_index_from_char(self):
-		line = self._current_line()
-		words = self._words_with_indices(line)
-		idx = self.currentCharIndex
-		for i, (_, start, end) in enumerate(words):
-			if start <= idx < end:
-				self.currentWordIndex = i
-				return
-		self.currentWordIndex = len(words) - 1 if words else 0
+		words = self._current_line_words()
+		idx = words.index_at(self.currentCharIndex)
+		if idx is None:
+			idx = len(words) - 1 if words else 0
+		self.currentWordIndex = idx
+
+	def _character_symbol(self, line):
+		"""Spoken form of the character at the cursor in line, the current line."""
+		language = languageHandler.getLanguage()
+		text = self.symbols.get(language, line[self.currentCharIndex])
+		if not self.symbols.is_precomputed(language, line):
+			# the rest of the line's characters are rendered once this one has been spoken
+			wx.CallAfter(self.symbols.precompute, language, line)
+		return text
 
 	def _get_current_note_content(self):
 		if not self.currentNoteLines:
@@ -248,6 +955,223 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		parts.append(self.currentNoteLines[endLine].rstrip("\n")[: endChar + 1])
 		return "".join(parts)
 
+	def _reread_note(self, path, oldLines):
+		lines = self._get_note_lines(path)
+		if lines is oldLines:
+			return lines, None
+		if isinstance(lines, noteBuffer.PagedLines) or isinstance(oldLines, noteBuffer.PagedLines):
+			# diffing would decode every line of a paged note, so its position is only kept in range
+			return lines, None
+		return lines, noteDiff.LineMap.between(oldLines, lines)
+
+	def _replace_note_lines(self, path, oldLines, lines, lineMap, message):
+		"""Show a newer copy of the current note, moving the position and the selection with the diff."""
+		if lines is oldLines or oldLines is not self.currentNoteLines:
+			return
+		if not self.notes or self.notes[self.currentNoteIndex] != path:
+			return
+
+		def remap(marker):
+			if marker is None or not lines:
+				return None
+			if lineMap is not None:
+				return lineMap.line(marker[0]), marker[1]
+			return marker if marker[0] < len(lines) else None
+
+		lineIndex = self.currentLineIndex if lineMap is None else lineMap.line(self.currentLineIndex)
+		charIndex = self.currentCharIndex
+		markers = [remap(self.selectionStart), remap(self.selectionEnd)]
+		self._show_note_lines(lines, lineIndex)
+		self.currentCharIndex = max(0, min(charIndex, len(self._current_line()) - 1))
+		self._update_word_index_from_char()
+		self.selectionStart, self.selectionEnd = markers
+		if message:
+			ui.message(message)
+
+	def _reload_note(self, path, message=None, error=None):
+		"""Read the current note again in the background, keeping the position where it still fits."""
+		oldLines = self.currentNoteLines
+		self.tasks.submit(
+			"reload",
+			self._reread_note,
+			lambda result: self._replace_note_lines(path, oldLines, result[0], result[1], message),
+			path,
+			oldLines,
+			error=error or self._report_error,
+		)
+
+	def _update_watch(self):
+		"""Watch the configured folders and the note being shown for changes."""
+		if self.watcher is None:
+			return
+		targets = dict.fromkeys(self.paths)
+		if self.notes and 0 <= self.currentNoteIndex < len(self.notes):
+			path = self.notes[self.currentNoteIndex]
+			targets[path] = self.noteCache.stamp_of(path, self.currentNoteLines)
+		self.watcher.watch(targets)
+
+	def _path_changed(self, path):
+		"""Bring the open note or a folder listing up to date after the watcher noticed a change."""
+		shown = self.notes[self.currentNoteIndex] if 0 <= self.currentNoteIndex < len(self.notes) else None
+		if path == shown:
+			if self.following:
+				self._read_new_lines(False)
+			else:
+				self._reload_note(path, _("Note changed"), self._reload_failed)
+		if path not in self.paths:
+			# a note edited in place leaves the mtime of its folder alone, so its stats are taken here
+			self.tasks.submit("restat", self.folderIndex.update_note, None, path)
+		elif self._discoveredNotes is None:
+			self.tasks.submit(
+				"refresh " + path,
+				self.folderIndex.list_notes,
+				lambda listing: self._patch_folder(path, listing),
+				path,
+				self.fileFilter,
+				error=self._report_error,
+			)
+
+	def _reload_failed(self, exception):
+		# a deleted note is reported when the listing of its folder is patched
+		if not isinstance(exception, FileNotFoundError):
+			self._report_error(exception)
+
+	def _patch_folder(self, folder, listing):
+		"""Put the new listing of the notes directly in folder into the notes being browsed."""
+		if listing is None:
+			return
+		path = self.notes[self.currentNoteIndex] if self.notes else None
+		if self.allNotes is not None and folder in self.allNotes.folders:
+			index = self.allNotes.folders.index(folder)
+			oldListing = self.allNotes.listings[index]
+			listings = list(self.allNotes.listings)
+			listings[index] = listing
+			self.allNotes = mergedNotes.MergedNotes(self.allNotes.folders, listings)
+			if self.allFolders:
+				self._listing_patched(self.allNotes, path)
+				return
+			if self.listedNotes is oldListing:
+				self._listing_patched(listing, path)
+				return
+		if self.allFolders or folder != self.notesPath or not isinstance(self.listedNotes, list):
+			return
+		# the folder's own notes come first in name order, before those of its archives and subfolders
+		notes = self.listedNotes
+		prefix = os.path.join(folder, "")
+		count = 0
+		for note in notes:
+			if not note.startswith(prefix) or os.sep in note[len(prefix) :]:
+				break
+			count += 1
+		if notes[:count] == listing:
+			return
+		notes[:count] = listing
+		self._listing_patched(notes, path)
+
+	def _listing_patched(self, notes, path):
+		"""Browse an updated listing, staying on the note shown if it is still listed."""
+		self._browse(notes)
+		notes = self.notes
+		self.nameIndex = None
+		if path is not None and path in notes:
+			self.currentNoteIndex = notes.index(path)
+		elif notes:
+			if path is not None:
+				ui.message(_("{} removed").format(os.path.basename(path)))
+			self._open_note(min(self.currentNoteIndex, len(notes) - 1))
+		else:
+			self.currentNoteIndex = 0
+			self._show_note_lines([])
+			ui.message(_("No notes"))
+
+	def _current_follower(self):
+		"""Return the follower of the current note, or None if the note must be reloaded to follow it."""
+		lines = self.currentNoteLines
+		if self.follower is not None and self.follower.lines is lines:
+			return self.follower
+		path = self.notes[self.currentNoteIndex]
+		# the stamp the lines were read with tells how much of the note they hold
+		stamp = self.noteCache.stamp_of(path, lines)
+		if stamp is None:
+			return None
+		encoding = self.folderIndex.get_encoding(path, stamp)
+		self.follower = noteFollow.NoteFollower(path, lines, stamp, encoding)
+		return self.follower
+
+	def _read_new_lines(self, verbose):
+		"""Read what has been appended to the current note in the background and add it to its lines."""
+		if not self.notes:
+			if verbose:
+				ui.message(_("No notes"))
+			return
+		path = self.notes[self.currentNoteIndex]
+		if self.archives.is_member(path):
+			if verbose:
+				ui.message(_("Notes in archives cannot grow"))
+			return
+		follower = self._current_follower()
+		if follower is None:
+			self._reload_note(path)
+			return
+		self.tasks.submit(
+			"follow",
+			follower.read_appended,
+			lambda appended: self._add_new_lines(follower, appended, verbose),
+			error=self._follow_failed,
+		)
+
+	def _add_new_lines(self, follower, appended, verbose):
+		if follower is not self.follower or follower.lines is not self.currentNoteLines:
+			return
+		if appended is noteFollow.REPLACED:
+			self.follower = None
+			ui.message(_("Note replaced"))
+			self._reload_note(follower.path)
+			return
+		first = None
+		if appended is not None:
+			# an outline being built would be out of date, and reads the old map of a paged note
+			self.tasks.cancel("outline")
+			follower.commit(appended)
+			lines = follower.lines
+			first = lines.grow() if follower.paged else noteFollow.append_text(lines, appended[1])
+			self.noteCache.store(follower.path, follower.stamp, lines)
+		if first is None:
+			if verbose:
+				ui.message(_("No new lines"))
+			return
+		self.outline = None
+		if self.currentLineIndex >= first:
+			self._currentLineText = None
+			self.lineWords.clear()
+		if verbose or self.options["announceNewLines"]:
+			self._announce_new_lines(first)
+
+	def _announce_new_lines(self, first):
+		count = len(self.currentNoteLines) - first
+		if count > MAX_ANNOUNCED_LINES:
+			ui.message(_("{} new lines").format(count))
+		else:
+			ui.message("\n".join(line.rstrip("\r\n") for line in self.currentNoteLines[first:]))
+
+	def _follow_failed(self, exception):
+		self._stop_following()
+		self._report_error(exception)
+
+	def _follow_tick(self):
+		self._followTimer = None
+		if not self.following:
+			return
+		self._read_new_lines(False)
+		if self.options["followInterval"] > 0:
+			self._followTimer = wx.CallLater(self.options["followInterval"], self._follow_tick)
+
+	def _stop_following(self):
+		self.following = False
+		if self._followTimer is not None:
+			self._followTimer.Stop()
+			self._followTimer = None
+
 	@script(description=_("Open the path"))
 	def script_open_path(self, gesture):
 		subprocess.Popen(f'explorer "{self.notesPath}"', shell=True)
@@ -258,44 +1182,289 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		wx.CallAfter(self._show_paths_dialog)
 
 	def _show_paths_dialog(self):
-		dlg = SettingsDialog(gui.mainFrame, self.paths, self.fileTypes)
+		dlg = SettingsDialog(gui.mainFrame, self.paths, self.fileTypes, self.fileRules)
 		if dlg.ShowModal() == wx.ID_OK:
 			self.paths = dlg.get_paths() or [os.path.join(self.configFolder, "notes")]
 			self.currentPathIndex = min(self.currentPathIndex, len(self.paths) - 1)
 			self.notesPath = self.paths[self.currentPathIndex]
+			self.allNotes = None
 			with open(self.pathsFile, "w", encoding="utf-8") as f:
 				f.write("\n".join(self.paths) + "\n")
 			self.fileTypes = dlg.get_file_types() or ["txt"]
 			with open(self.fileTypesFile, "w", encoding="utf-8") as f:
 				f.write("\n".join(self.fileTypes) + "\n")
+			self.fileRules = dlg.get_rules()
+			with open(self.rulesFile, "w", encoding="utf-8") as f:
+				f.write("".join(rule + "\n" for rule in self.fileRules))
+			self.fileFilter = fileRules.FileFilter(self.fileTypes, self.fileRules)
 		dlg.Destroy()
 
 	@script(description=_("Move to previous folder"))
 	def script_previous_folder(self, gesture):
-		if self.currentPathIndex > 0:
+		if self.allFolders and self.currentPathIndex > 0:
+			self._filter_folder(self.currentPathIndex - 1)
+		elif self.currentPathIndex > 0:
 			self.currentPathIndex -= 1
 			self.notesPath = self.paths[self.currentPathIndex]
 			folder = os.path.basename(self.notesPath.rstrip("/\\")) or self.notesPath
-			ui.message(folder + " " + self._load_notes())
+			self._load_notes(folder + " ")
 		else:
 			folder = os.path.basename(self.notesPath.rstrip("/\\")) or self.notesPath
 			ui.message(_("No previous folder, {}").format(folder))
 
 	@script(description=_("Move to next folder"))
 	def script_next_folder(self, gesture):
-		if self.currentPathIndex < len(self.paths) - 1:
+		if self.allFolders and self.currentPathIndex < len(self.paths) - 1:
+			self._filter_folder(self.currentPathIndex + 1)
+		elif self.currentPathIndex < len(self.paths) - 1:
 			self.currentPathIndex += 1
 			self.notesPath = self.paths[self.currentPathIndex]
 			folder = os.path.basename(self.notesPath.rstrip("/\\")) or self.notesPath
-			ui.message(folder + " " + self._load_notes())
+			self._load_notes(folder + " ")
 		else:
 			folder = os.path.basename(self.notesPath.rstrip("/\\")) or self.notesPath
 			ui.message(_("No next folder, {}").format(folder))
 
+	@script(description=_("Toggle browsing the notes of all folders together"))
+	def script_toggle_all_folders(self, gesture):
+		if self.allFolders:
+			path = self.notes[self.currentNoteIndex] if self.notes else None
+			index = self.allNotes.folder_index(path) if self.allNotes is not None and path else None
+			self._filter_folder(self.currentPathIndex if index is None else index)
+			return
+		self.allFolders = True
+		if self.allNotes is not None and self.allNotes.folders == self.paths:
+			self._show_all_folders(self.allNotes)
+		else:
+			self.prefetcher.cancel()
+			self.tasks.submit(
+				"navigate",
+				self._list_all_folders,
+				self._show_all_folders,
+				list(self.paths),
+				self.fileFilter,
+				error=self._report_error,
+			)
+
+	def _resort(self):
+		"""Sort the notes being browsed again in the current sort mode, staying on the current note."""
+		path = self.notes[self.currentNoteIndex] if self.notes else None
+		self.notes = self._sorted(self.listedNotes)
+		self.nameIndex = None
+		if path is not None:
+			self.currentNoteIndex = self.notes.index(path)
+			self._schedule_prefetch()
+
+	@script(description=_("Switch to the next sort order of notes"))
+	def script_next_sort_mode(self, gesture):
+		modes = noteSort.SORT_MODES
+		self.sortMode = modes[(modes.index(self.sortMode) + 1) % len(modes)]
+		self._resort()
+		self._save_session_later()
+		names = {
+			"name": _("Sorted by name"),
+			"natural": _("Sorted by name, numbers by value"),
+			"modified": _("Recently modified first"),
+			"created": _("Recently created first"),
+			"size": _("Largest first"),
+		}
+		ui.message(names[self.sortMode])
+
+	@script(description=_("Jump to note by name"))
+	def script_jump_to_note(self, gesture):
+		if not self.notes:
+			ui.message(_("No notes"))
+		elif self.nameIndex is not None and self.nameIndex.notes is self.notes:
+			wx.CallAfter(self._show_finder_dialog, self.nameIndex)
+		else:
+			self.tasks.submit("finder", noteFinder.NameIndex, self._show_finder_dialog, self.notes)
+
+	def _show_finder_dialog(self, nameIndex):
+		self.nameIndex = nameIndex
+		if nameIndex.notes is not self.notes:
+			return
+		dlg = noteFinder.NoteFinderDialog(gui.mainFrame, nameIndex)
+		if dlg.ShowModal() == wx.ID_OK:
+			index = dlg.get_note_index()
+			if index is not None and nameIndex.notes is not self.notes:
+				# the notes were patched or sorted again while the dialog was open
+				path = nameIndex.notes[index]
+				index = self.notes.index(path) if path in self.notes else None
+				if index is None:
+					ui.message(_("Note not found, {}").format(os.path.basename(path)))
+			if index is not None:
+				self._open_note(index)
+		dlg.Destroy()
+
+	@script(description=_("Search notes"))
+	def script_search(self, gesture):
+		self.searchIndex.refresh(self.paths, self.fileFilter)
+		wx.CallAfter(self._show_search_dialog)
+
+	def _show_search_dialog(self):
+		dlg = wx.TextEntryDialog(
+			gui.mainFrame, _("Search all folders for:"), _("Search notes"), self.searchQuery
+		)
+		if dlg.ShowModal() == wx.ID_OK:
+			self.grepTasks.cancel("grep")
+			self.searchQuery = dlg.GetValue().strip()
+			self.searchResults = self.searchIndex.search(self.searchQuery)
+			self.searchResultIndex = 0
+			if self.searchResults:
+				ui.message(_("{} results").format(len(self.searchResults)))
+				self._announce_search_result()
+			elif not self.searchIndex.ready:
+				ui.message(_("Search index is still being built"))
+			else:
+				ui.message(_("No results"))
+		dlg.Destroy()
+
+	@script(description=_("Find a regular expression in all folders"))
+	def script_grep(self, gesture):
+		wx.CallAfter(self._show_grep_dialog)
+
+	def _show_grep_dialog(self):
+		dlg = wx.TextEntryDialog(
+			gui.mainFrame,
+			_("Regular expression to find in all folders:"),
+			_("Find in notes"),
+			self.grepPattern,
+		)
+		if dlg.ShowModal() == wx.ID_OK and dlg.GetValue():
+			self.grepPattern = dlg.GetValue()
+			self._start_grep(self.grepPattern)
+		dlg.Destroy()
+
+	def _read_archived(self, path):
+		return self.archives.read_member(path) if self.archives.is_member(path) else None
+
+	def _grep_lines(self, path):
+		# read as the view would read them, but past the note cache, so a search does not evict notes
+		return self._read_note_lines(path, self._note_stamp(path))
+
+	def _start_grep(self, pattern):
+		"""Search all folders for pattern, adding the matches to the search results as they are found."""
+		try:
+			grep = noteGrep.NoteGrep(pattern, max(1, self.options["grepMaxHits"]), self._grep_lines)
+		except re.error as e:
+			ui.message(_("Not a valid regular expression, {}").format(e))
+			return
+		results = []
+		self.searchResults = results
+		self.searchResultIndex = 0
+		ui.message(_("Searching"))
+		self.grepTasks.submit_streaming(
+			"grep",
+			self._grep_folders,
+			lambda batch: self._grep_found(results, batch),
+			lambda stopped: self._grep_done(results, stopped),
+			grep,
+			list(self.paths),
+			self.fileFilter,
+			error=self._report_error,
+		)
+
+	def _grep_folders(self, report, grep, folders, fileFilter):
+		def candidates():
+			for folder in folders:
+				for batch in self._walk_folder(folder, fileFilter):
+					yield from batch
+
+		return grep.run(report, candidates())
+
+	def _grep_found(self, results, batch):
+		if results is not self.searchResults or not batch:
+			return
+		first = not results
+		results.extend(batch)
+		if first:
+			self._announce_search_result()
+
+	def _grep_done(self, results, stopped):
+		if results is not self.searchResults:
+			return
+		if not results:
+			ui.message(_("No matches"))
+		elif stopped:
+			ui.message(_("Stopped after {} matches").format(len(results)))
+		else:
+			ui.message(_("{} matches").format(len(results)))
+
+	def _announce_search_result(self):
+		path, lineIndex = self.searchResults[self.searchResultIndex]
+		self._open_note_at(path, lineIndex)
+
+	@script(description=_("Move to next search result"))
+	def script_next_result(self, gesture):
+		if self.searchResults and self.searchResultIndex < len(self.searchResults) - 1:
+			self.searchResultIndex += 1
+			self._announce_search_result()
+		elif self.searchResults:
+			ui.message(_("No next result"))
+		else:
+			ui.message(_("No search results"))
+
+	@script(description=_("Move to previous search result"))
+	def script_previous_result(self, gesture):
+		if self.searchResults and self.searchResultIndex > 0:
+			self.searchResultIndex -= 1
+			self._announce_search_result()
+		elif self.searchResults:
+			ui.message(_("No previous result"))
+		else:
+			ui.message(_("No search results"))
+
 	@script(description=_("Read current note"))
 	def script_read_note(self, gesture):
-		content = self._get_current_note_content()
-		ui.message(content if content else _("Empty note"))
+		path = self.notes[self.currentNoteIndex] if self.notes else None
+		if path is None or not self.noteReader.start(path, self.currentNoteLines):
+			ui.message(_("Empty note"))
+
+	@script(description=_("Resume reading current note"))
+	def script_resume_reading(self, gesture):
+		path = self.notes[self.currentNoteIndex] if self.notes else None
+		if path is None or self.noteReader.path != path or self.noteReader.position is None:
+			ui.message(_("Nothing to resume"))
+			return
+		startLine, startChar = self.noteReader.position
+		self.noteReader.start(path, self.currentNoteLines, startLine, startChar)
+
+	@script(description=_("Report the line and word counts, size, encoding and first heading of the note"))
+	def script_note_statistics(self, gesture):
+		if not self.notes:
+			ui.message(_("No notes"))
+			return
+		path = self.notes[self.currentNoteIndex]
+		stats = self._catalogued(path)
+		if stats is not None:
+			self._announce_statistics(stats)
+			return
+		# not in the catalog yet, or changed since it was counted
+		self.tasks.submit(
+			"statistics", self._count_note, self._announce_statistics, path, error=self._report_error
+		)
+
+	def _catalogued(self, path):
+		"""Return the catalog's stats of a note as of the stamp the folder index holds for it, or None.
+
+		The folder index holds the stamp the note was last read or scanned with, so nothing is read from
+		disk; notes in archives have no stamp there and are taken as last counted.
+		"""
+		stat = self.folderIndex.stat_table([path]).get(path)
+		return self.catalog.lookup(path, stat[:2] if stat is not None else None)
+
+	def _count_note(self, path):
+		return self.catalog.count_note(path, self._note_stamp(path))
+
+	def _announce_statistics(self, stats):
+		parts = [
+			_("{} lines").format(stats.lines),
+			_("{} words").format(stats.words),
+			noteCatalog.format_size(stats.size),
+			stats.encoding,
+			_("first heading {}").format(stats.heading) if stats.heading else _("no headings"),
+		]
+		ui.message(", ".join(parts))
 
 	@script(description=_("Copy note"))
 	def script_copy_note(self, gesture):
@@ -308,14 +1477,12 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
 	@script(description=_("Load all notes"))
 	def script_load_notes(self, gesture):
-		ui.message(self._load_notes())
+		self._load_notes()
 
 	@script(description=_("Move to next note"))
 	def script_next_note(self, gesture):
 		if self.notes and self.currentNoteIndex < len(self.notes) - 1:
-			self.currentNoteIndex += 1
-			self._load_current_note_lines()
-			ui.message(os.path.basename(self.notes[self.currentNoteIndex]))
+			self._open_note(self.currentNoteIndex + 1)
 		elif self.notes:
 			ui.message(_("No next note, {}").format(os.path.basename(self.notes[self.currentNoteIndex])))
 		else:
@@ -324,9 +1491,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 	@script(description=_("Move to previous note"))
 	def script_previous_note(self, gesture):
 		if self.notes and self.currentNoteIndex > 0:
-			self.currentNoteIndex -= 1
-			self._load_current_note_lines()
-			ui.message(os.path.basename(self.notes[self.currentNoteIndex]))
+			self._open_note(self.currentNoteIndex - 1)
 		elif self.notes:
 			ui.message(_("No previous note, {}").format(os.path.basename(self.notes[self.currentNoteIndex])))
 		else:
@@ -344,6 +1509,88 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			self._set_current_line(self.currentLineIndex - 1)
 		ui.message(self._current_line())
 
+	def _with_outline(self, action):
+		"""Call action with the current note's outline, building it in the background the first time."""
+		if self.outline is not None:
+			action(self.outline)
+			return
+		lines = self.currentNoteLines
+		self.tasks.submit(
+			"outline",
+			noteOutline.build_outline,
+			lambda outline: self._outline_ready(lines, outline, action),
+			lines,
+			self.options["outlineMarker"],
+		)
+
+	def _outline_ready(self, lines, outline, action):
+		if lines is self.currentNoteLines:
+			self.outline = outline
+			action(outline)
+
+	def _jump_to_outline(self, kind, forward, notFound):
+		def jump(outline):
+			starts = getattr(outline, kind)
+			if forward:
+				target = outline.next_after(starts, self.currentLineIndex)
+			else:
+				target = outline.previous_before(starts, self.currentLineIndex)
+			if target is None:
+				ui.message(notFound)
+				return
+			self._set_current_line(target)
+			ui.message(self._current_line())
+
+		if self.currentNoteLines:
+			self._with_outline(jump)
+		else:
+			ui.message(notFound)
+
+	@script(description=_("Move to next heading"))
+	def script_next_heading(self, gesture):
+		self._jump_to_outline("headings", True, _("No next heading"))
+
+	@script(description=_("Move to previous heading"))
+	def script_previous_heading(self, gesture):
+		self._jump_to_outline("headings", False, _("No previous heading"))
+
+	@script(description=_("Move to next paragraph"))
+	def script_next_paragraph(self, gesture):
+		self._jump_to_outline("paragraphs", True, _("No next paragraph"))
+
+	@script(description=_("Move to previous paragraph"))
+	def script_previous_paragraph(self, gesture):
+		self._jump_to_outline("paragraphs", False, _("No previous paragraph"))
+
+	@script(description=_("Go to line number or percentage"))
+	def script_go_to_line(self, gesture):
+		if self.currentNoteLines:
+			wx.CallAfter(self._show_go_to_line_dialog)
+		else:
+			ui.message(_("Empty note"))
+
+	def _show_go_to_line_dialog(self):
+		lineCount = len(self.currentNoteLines)
+		dlg = wx.TextEntryDialog(
+			gui.mainFrame,
+			_("Line number from 1 to {}, or a percentage such as 50%:").format(lineCount),
+			_("Go to line"),
+			str(self.currentLineIndex + 1),
+		)
+		if dlg.ShowModal() == wx.ID_OK:
+			value = dlg.GetValue().strip()
+			try:
+				if value.endswith("%"):
+					index = round(float(value[:-1]) / 100 * (lineCount - 1))
+				else:
+					index = int(value) - 1
+			except (ValueError, OverflowError):
+				ui.message(_("Not a line number"))
+			else:
+				self._set_current_line(max(0, min(index, lineCount - 1)))
+				ui.message(_("Line {}").format(self.currentLineIndex + 1) + " " + self._current_line())
+		dlg.Destroy()
+
 	@script(description=_("Copy current line"))
 	def script_copy_line(self, gesture):
 		line = self._current_line()
@@ -362,8 +1609,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			self.currentCharIndex += 1
 		self._update_word_index_from_char()
 		if line:
-			char = line[self.currentCharIndex]
-			ui.message(characterProcessing.processSpeechSymbol(languageHandler.getLanguage(), char))
+			ui.message(self._character_symbol(line))
 
 	@script(description=_("Move to previous character"))
 	def script_previous_character(self, gesture):
@@ -373,8 +1619,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			self.currentCharIndex -= 1
 		self._update_word_index_from_char()
 		if line:
-			char = line[self.currentCharIndex]
-			ui.message(characterProcessing.processSpeechSymbol(languageHandler.getLanguage(), char))
+			ui.message(self._character_symbol(line))
 
 	@script(description=_("Move to start of line"))
 	def script_start_of_line(self, gesture):
@@ -382,8 +1627,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		self.currentCharIndex = 0
 		self._update_word_index_from_char()
 		if line:
-			char = line[self.currentCharIndex]
-			ui.message(characterProcessing.processSpeechSymbol(languageHandler.getLanguage(), char))
+			ui.message(self._character_symbol(line))
 
 	@script(description=_("Move to end of line"))
 	def script_end_of_line(self, gesture):
@@ -391,32 +1635,29 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		self.currentCharIndex = max(0, len(line) - 1)
 		self._update_word_index_from_char()
 		if line:
-			char = line[self.currentCharIndex]
-			ui.message(characterProcessing.processSpeechSymbol(languageHandler.getLanguage(), char))
+			ui.message(self._character_symbol(line))
 
 	@script(description=_("Move to next word"))
 	def script_next_word(self, gesture):
-		words = self._words_with_indices(self._current_line())
+		words = self._current_line_words()
 		if not words:
 			return
-		next_idx = next((i for i, (_, start, _) in enumerate(words) if start > self.currentCharIndex), None)
+		next_idx = words.next_after(self.currentCharIndex)
 		if next_idx is not None:
 			self.currentWordIndex = next_idx
-		self.currentCharIndex = words[self.currentWordIndex][1]
-		ui.message(words[self.currentWordIndex][0])
+		self.currentCharIndex = words.starts[self.currentWordIndex]
+		ui.message(words.word(self.currentWordIndex))
 
 	@script(description=_("Move to previous word"))
 	def script_previous_word(self, gesture):
-		words = self._words_with_indices(self._current_line())
+		words = self._current_line_words()
 		if not words:
 			return
-		prev_idx = next(
-			(i for i in range(len(words) - 1, -1, -1) if words[i][1] < self.currentCharIndex), None
-		)
+		prev_idx = words.previous_before(self.currentCharIndex)
 		if prev_idx is not None:
 			self.currentWordIndex = prev_idx
-		self.currentCharIndex = words[self.currentWordIndex][1]
-		ui.message(words[self.currentWordIndex][0])
+		self.currentCharIndex = words.starts[self.currentWordIndex]
+		ui.message(words.word(self.currentWordIndex))
 
 	@script(description=_("Set selection start"))
 	def script_set_selection_start(self, gesture):
@@ -426,9 +1667,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		self.selectionStart = (self.currentLineIndex, self.currentCharIndex)
 		line = self._current_line()
 		if line and self.currentCharIndex < len(line):
-			char = characterProcessing.processSpeechSymbol(
-				languageHandler.getLanguage(), line[self.currentCharIndex]
-			)
+			char = self._character_symbol(line)
 		else:
 			char = _("blank")
 		ui.message(_("selection start: ") + char)
@@ -442,9 +1681,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			self.selectionEnd = (self.currentLineIndex, self.currentCharIndex)
 			line = self._current_line()
 			if line and self.currentCharIndex < len(line):
-				char = characterProcessing.processSpeechSymbol(
-					languageHandler.getLanguage(), line[self.currentCharIndex]
-				)
+				char = self._character_symbol(line)
 			else:
 				char = _("blank")
 			ui.message(_("selection end: ") + char)
@@ -462,16 +1699,113 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		self.selectionEnd = None
 		ui.message(_("selection cleared"))
 
+	@script(description=_("Set a named bookmark at the current position"))
+	def script_set_bookmark(self, gesture):
+		if self._shownNote is None:
+			ui.message(_("Empty note"))
+			return
+		wx.CallAfter(self._show_bookmark_name_dialog, self._shownNote, self.currentNoteLines)
+
+	def _show_bookmark_name_dialog(self, path, lines):
+		dlg = wx.TextEntryDialog(
+			gui.mainFrame,
+			_("Bookmark name, the name of an existing bookmark to move it here:"),
+			_("Set bookmark"),
+			self._current_line().strip()[:40],
+		)
+		if dlg.ShowModal() == wx.ID_OK:
+			name = dlg.GetValue().strip()
+			if not name:
+				ui.message(_("No bookmark name"))
+			elif lines is self.currentNoteLines:
+				self.positions.set_bookmark(path, name, lines, self.currentLineIndex, self.currentCharIndex)
+				self._save_session_later()
+				ui.message(_("Bookmark {} set").format(name))
+		dlg.Destroy()
+
+	@script(description=_("Jump to a bookmark of the current note"))
+	def script_jump_to_bookmark(self, gesture):
+		names = self.positions.bookmarks(self._shownNote) if self._shownNote is not None else []
+		if names:
+			wx.CallAfter(self._show_bookmarks_dialog, self._shownNote, names)
+		else:
+			ui.message(_("No bookmarks"))
+
+	def _show_bookmarks_dialog(self, path, names):
+		dlg = wx.SingleChoiceDialog(gui.mainFrame, _("Bookmarks of this note:"), _("Jump to bookmark"), names)
+		if dlg.ShowModal() == wx.ID_OK and path == self._shownNote:
+			self._jump_to_bookmark(path, dlg.GetStringSelection())
+		dlg.Destroy()
+
+	def _jump_to_bookmark(self, path, name):
+		# the bookmarked line is found again by its fingerprint if the note changed since
+		position = self.positions.find_bookmark(path, name, self.currentNoteLines)
+		if position is None:
+			ui.message(_("No bookmarks"))
+			return
+		self._set_current_line(position[0])
+		self.currentCharIndex = max(0, min(position[1], len(self._current_line()) - 1))
+		self._update_word_index_from_char()
+		ui.message(_("Line {}").format(self.currentLineIndex + 1) + " " + self._current_line())
+
+	@script(description=_("Toggle following the current note as it grows"))
+	def script_toggle_follow(self, gesture):
+		if self.following:
+			self._stop_following()
+			ui.message(_("Follow off"))
+			return
+		self.following = True
+		ui.message(_("Follow on"))
+		self._follow_tick()
+
+	@script(description=_("Read lines appended to the current note"))
+	def script_read_new_lines(self, gesture):
+		self._read_new_lines(True)
+
+	@script(description=_("Toggle timing of invisinote gestures"))
+	def script_toggle_timing(self, gesture):
+		if self.tracer.enabled:
+			self.tracer.disable(self)
+			ui.message(_("Timing off"))
+		else:
+			self.tracer.enable(self)
+			ui.message(_("Timing on"))
+
+	@script(description=_("Report gesture timings"))
+	def script_report_timings(self, gesture):
+		rows = self.tracer.summary()
+		if not rows:
+			ui.message(_("No timings recorded"))
+			return
+		text = self.tracer.format_summary()
+		log.info("invisinote timings:\n" + text)
+		with open(os.path.join(self.configFolder, "timings.txt"), "w", encoding="utf-8") as f:
+			f.write(text + "\n")
+		slowest = ", ".join(
+			_("{name} {time:.0f} ms").format(name=row[0].replace("script_", ""), time=row[3] * 1000)
+			for row in rows[:3]
+		)
+		calls = sum(row[1] for row in rows)
+		ui.message(_("{} calls timed, slowest at the 90th percentile: {}").format(calls, slowest))
+
 	__gestures = {
 		"kb:NVDA+ALT+P": "open_path",
 		"kb:NVDA+ALT+SHIFT+P": "edit_paths",
 		"kb:NVDA+ALT+[": "previous_folder",
 		"kb:NVDA+ALT+]": "next_folder",
 		"kb:NVDA+ALT+N": "load_notes",
+		"kb:NVDA+ALT+SHIFT+N": "toggle_all_folders",
 		"kb:NVDA+ALT+U": "previous_note",
 		"kb:NVDA+ALT+O": "next_note",
+		"kb:NVDA+ALT+SHIFT+O": "jump_to_note",
+		"kb:NVDA+ALT+S": "next_sort_mode",
 		"kb:NVDA+ALT+I": "previous_line",
 		"kb:NVDA+ALT+K": "next_line",
+		"kb:NVDA+ALT+SHIFT+I": "previous_heading",
+		"kb:NVDA+ALT+SHIFT+K": "next_heading",
+		"kb:NVDA+ALT+PAGEUP": "previous_paragraph",
+		"kb:NVDA+ALT+PAGEDOWN": "next_paragraph",
+		"kb:NVDA+ALT+SHIFT+L": "go_to_line",
 		"kb:NVDA+ALT+J": "previous_word",
 		"kb:NVDA+ALT+L": "next_word",
 		"kb:NVDA+ALT+,": "previous_character",
@@ -479,9 +1813,41 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		"kb:NVDA+ALT+H": "start_of_line",
 		"kb:NVDA+ALT+'": "end_of_line",
 		"kb:NVDA+ALT+SHIFT+A": "read_note",
+		"kb:NVDA+ALT+SHIFT+R": "resume_reading",
+		"kb:NVDA+ALT+SHIFT+S": "note_statistics",
 		"kb:NVDA+ALT+A": "copy_note",
 		"kb:NVDA+ALT+;": "copy_line",
 		"kb:NVDA+ALT+F9": "set_selection_start",
 		"kb:NVDA+ALT+F10": "set_selection_end",
 		"kb:NVDA+ALT+BACKSPACE": "clear_markers",
+		"kb:NVDA+ALT+B": "set_bookmark",
+		"kb:NVDA+ALT+SHIFT+B": "jump_to_bookmark",
+		"kb:NVDA+ALT+SHIFT+F": "toggle_follow",
+		"kb:NVDA+ALT+E": "read_new_lines",
+		"kb:NVDA+ALT+F": "search",
+		"kb:NVDA+ALT+G": "next_result",
+		"kb:NVDA+ALT+SHIFT+G": "previous_result",
+		"kb:NVDA+ALT+R": "grep",
+		"kb:NVDA+ALT+SHIFT+T": "toggle_timing",
+		"kb:NVDA+ALT+T": "report_timings",
 	}
+
+
+def _starting(script):
+	"""Wrap a script so that it starts the plugin first.
+
+	Gestures remapped in NVDA's input gestures dialog are looked up with getattr, never through
+	getScript, so the start has to happen in the scripts themselves.
+	"""
+
+	@functools.wraps(script)
+	def wrapper(self, gesture):
+		self._ensure_started()
+		return script(self, gesture)
+
+	return wrapper
+
+
+for _name, _value in list(vars(GlobalPlugin).items()):
+	if _name.startswith("script_"):
+		setattr(GlobalPlugin, _name, _starting(_value))
@@ -0,0 +1,81 @@
+import threading
+
+
+class BackgroundRefresh:
+	"""Base of the indexes kept of the notes in the configured folders, brought up to date on a thread.
+
+	A refresh only passes notes to _note_changed whose (mtime_ns, size) stamp differs from the one
+	_known_stamp returns, and the notes no longer listed to _notes_removed. It runs on a thread started
+	for it, which ends once no refresh is queued; refreshing while one runs queues the latest folders for
+	another pass. A folder that cannot be listed is skipped, and nothing is removed in that pass.
+	"""
+
+	threadName = "invisinote refresh"
+
+	def __init__(self, listNotes, noteStamps):
+		self._listNotes = listNotes
+		# noteStamps(paths) returns {path: (mtime_ns, size)} for the notes among paths that still exist
+		self._noteStamps = noteStamps
+		self._lock = threading.Lock()
+		self._thread = None
+		self._pending = None
+
+	def refresh(self, folders, fileFilter):
+		"""Start an incremental refresh in the background, or queue one if a refresh is running."""
+		with self._lock:
+			self._pending = (list(folders), fileFilter)
+			if self._thread is not None:
+				return
+			self._thread = threading.Thread(target=self._run, name=self.threadName, daemon=True)
+			self._thread.start()
+
+	def _run(self):
+		try:
+			while True:
+				with self._lock:
+					job = self._pending
+					self._pending = None
+					if job is None:
+						self._thread = None
+						return
+				self._update(*job)
+		except BaseException:
+			# a refresh that failed must not leave later ones queued behind a thread that is gone
+			with self._lock:
+				self._thread = None
+			raise
+
+	def _update(self, folders, fileFilter):
+		"""Bring the index up to date with folders; returns whether anything in it changed."""
+		seen = set()
+		changed = False
+		complete = True
+		for folder in folders:
+			try:
+				notes = self._listNotes(folder, fileFilter) or ()
+			except OSError:
+				# an unreadable folder, or a share gone during the walk, is left for the next refresh
+				complete = False
+				continue
+			stamps = self._noteStamps(notes)
+			for path in notes:
+				seen.add(path)
+				stamp = stamps.get(path)
+				if stamp is not None and self._known_stamp(path) != stamp:
+					changed = self._note_changed(path, stamp) or changed
+		if not complete:
+			# the notes of a folder that could not be listed are kept until it can be
+			return changed
+		return self._notes_removed(seen) or changed
+
+	def _known_stamp(self, path):
+		"""The stamp a note was last taken in at, or None."""
+		raise NotImplementedError
+
+	def _note_changed(self, path, stamp):
+		"""Take in a note that is new or changed since; returns whether the index changed."""
+		raise NotImplementedError
+
+	def _notes_removed(self, seen):
+		"""Drop the notes that are not in seen; returns whether the index changed."""
+		raise NotImplementedError
@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import wx
+
+
+class TaskRunner:
+	"""Runs blocking work on a small thread pool and hands the results back on the main thread.
+
+	Work is submitted on a named channel. Submitting again on the same channel supersedes the earlier
+	request: it is cancelled if it has not started yet, and its result is dropped if it has, so only
+	the latest request on a channel ever reaches its callback.
+	"""
+
+	def __init__(self, workers=2):
+		self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="invisinote")
+		self._latest = {}
+		self._lock = threading.Lock()
+
+	def submit(self, channel, work, done, *args, error=None):
+		"""Run work(*args) in the background, then call done(result), if given, on the main thread.
+
+		If work raises, error(exception) is called on the main thread instead; without an error callback
+		the exception is re-raised there so that it is logged.
+		"""
+		with self._lock:
+			previous = self._latest.get(channel)
+			future = self._executor.submit(work, *args)
+			self._latest[channel] = future
+		if previous is not None:
+			previous.cancel()
+		future.add_done_callback(lambda f: wx.CallAfter(self._deliver, channel, f, done, error))
+		return future
+
+	def submit_streaming(self, channel, work, progress, done, *args, error=None):
+		"""Like submit, but work is called as work(report, *args) and may hand back results as it goes.
+
+		Each report(value) call from the worker calls progress(value) on the main thread, as long as the
+		request is still the latest on its channel. report returns False once the request has been
+		superseded, so the worker can stop early.
+		"""
+		submitted = []
+
+		def report(value):
+			with self._lock:
+				current = not submitted or self._latest.get(channel) is submitted[0]
+			if current:
+				wx.CallAfter(self._report, channel, submitted, progress, value)
+			return current
+
+		submitted.append(self.submit(channel, work, done, report, *args, error=error))
+		return submitted[0]
+
+	def _report(self, channel, submitted, progress, value):
+		with self._lock:
+			if self._latest.get(channel) is not submitted[0]:
+				return
+		progress(value)
+
+	def cancel(self, channel):
+		with self._lock:
+			future = self._latest.pop(channel, None)
+		if future is not None:
+			future.cancel()
+
+	def busy(self):
+		"""Whether any submitted work has not been delivered yet."""
+		with self._lock:
+			return bool(self._latest)
+
+	def _deliver(self, channel, future, done, error):
+		with self._lock:
+			if self._latest.get(channel) is not future:
+				return
+			del self._latest[channel]
+		if future.cancelled():
+			return
+		exception = future.exception()
+		if exception is None:
+			if done is not None:
+				done(future.result())
+		elif error is not None:
+			error(exception)
+		else:
+			raise exception
+
+	def shutdown(self):
+		with self._lock:
+			futures = list(self._latest.values())
+			self._latest.clear()
+		for future in futures:
+			future.cancel()
+		self._executor.shutdown(wait=False)
@@ -0,0 +1,80 @@
+import os
+import threading
+
+# seconds between checks right after a change, and the most a quiet spell stretches them to
+MIN_INTERVAL = 0.5
+MAX_INTERVAL = 8.0
+
+
+def _stamp(path):
+	try:
+		st = os.stat(path)
+	except OSError:
+		return None
+	return (st.st_mtime_ns, st.st_size)
+
+
+class StatPoller:
+	"""Change detection backend that compares stat results of the watched paths on a worker thread.
+
+	Every check that finds nothing changed doubles the time to the next one, up to MAX_INTERVAL, and
+	a change or a new set of paths brings it back to MIN_INTERVAL, so a quiet folder costs a few stat
+	calls a minute while an edit in progress is picked up quickly.
+
+	A backend is made with the callback to call with each changed path, from any thread. watch replaces
+	the watched paths, given as a dict of path to the (mtime_ns, size) stamp already known for it, or
+	None to take the stamp on the next check; stop ends the watching for good.
+	"""
+
+	def __init__(self, changed):
+		self._changed = changed
+		self._lock = threading.Lock()
+		self._wake = threading.Event()
+		self._stopped = False
+		self._targets = {}
+		self._thread = threading.Thread(target=self._run, name="invisinote watch", daemon=True)
+		self._thread.start()
+
+	def watch(self, targets):
+		with self._lock:
+			known = self._targets
+			self._targets = {
+				path: stamp if stamp is not None else known.get(path) for path, stamp in targets.items()
+			}
+		self._wake.set()
+
+	def stop(self):
+		self._stopped = True
+		self._wake.set()
+
+	def _check(self):
+		with self._lock:
+			known = dict(self._targets)
+		changed = []
+		current = {}
+		for path, stamp in known.items():
+			current[path] = _stamp(path)
+			if stamp is not None and current[path] != stamp:
+				changed.append(path)
+		with self._lock:
+			# a path given a new stamp by watch during the check keeps that stamp
+			for path, stamp in current.items():
+				if path in self._targets and self._targets[path] == known[path]:
+					self._targets[path] = stamp
+		return changed
+
+	def _run(self):
+		interval = MIN_INTERVAL
+		while True:
+			woken = self._wake.wait(interval)
+			self._wake.clear()
+			if self._stopped:
+				return
+			changed = self._check()
+			for path in changed:
+				self._changed(path)
+			interval = MIN_INTERVAL if changed or woken else min(interval * 2, MAX_INTERVAL)
+
+
+# change detection backends by the name the watchBackend option gives them
+BACKENDS = {"poll": StatPoller}
@@ -0,0 +1,131 @@
+import re
+import fnmatch
+
+# name of the file in a notes folder listing extra exclusions for that folder
+IGNORE_FILE = ".invisinoteignore"
+_REGEX_PREFIX = "re:"
+
+
+def _glob_regex(pattern):
+	"""Regular expression source matching a whole lowercased name for a glob pattern."""
+	return "(?:{})".format(fnmatch.translate(pattern.lower()))
+
+
+def _compile_pattern(pattern):
+	"""Compile a glob or "re:" pattern on its own; a "re:" pattern may match anywhere in the name."""
+	if pattern.startswith(_REGEX_PREFIX):
+		return re.compile(pattern[len(_REGEX_PREFIX) :], re.IGNORECASE)
+	return re.compile(_glob_regex(pattern))
+
+
+def parse_rule(text):
+	"""Split a rule such as "exclude *.swp" or "include re:^draft" into (include, pattern).
+
+	Raises ValueError with a message fit to show the user if the rule cannot be used.
+	"""
+	action, _sep, pattern = text.strip().partition(" ")
+	pattern = pattern.strip()
+	if action.lower() not in ("include", "exclude") or not pattern:
+		raise ValueError(_("A rule is include or exclude followed by a pattern"))
+	try:
+		_compile_pattern(pattern)
+	except re.error as e:
+		raise ValueError(_("Invalid regular expression: {}").format(e))
+	return action.lower() == "include", pattern
+
+
+def read_ignore_file(path):
+	"""Return the usable patterns of an ignore file, one glob or "re:" pattern per line."""
+	patterns = []
+	with open(path, "r", encoding="utf-8", errors="replace") as f:
+		for line in f:
+			line = line.strip()
+			if not line or line.startswith("#"):
+				continue
+			try:
+				_compile_pattern(line)
+			except re.error:
+				continue
+			patterns.append(line)
+	return patterns
+
+
+class _PatternSet:
+	"""Glob and "re:" patterns, matched against a name ignoring case.
+
+	The globs are compiled into a single regular expression. Each "re:" pattern is compiled on its own,
+	as inline flags such as (?i) must open an expression, and group names and numbers would clash.
+	"re:" patterns that do not compile are left out.
+	"""
+
+	def __init__(self, patterns):
+		globs = [pattern for pattern in patterns if not pattern.startswith(_REGEX_PREFIX)]
+		self._globs = None
+		if globs:
+			self._globs = re.compile("|".join(_glob_regex(pattern) for pattern in globs), re.IGNORECASE)
+		self._regexes = []
+		for pattern in patterns:
+			if pattern.startswith(_REGEX_PREFIX):
+				try:
+					self._regexes.append(_compile_pattern(pattern))
+				except re.error:
+					continue
+
+	def match(self, name):
+		if self._globs is not None and self._globs.match(name) is not None:
+			return True
+		return any(regex.search(name) is not None for regex in self._regexes)
+
+
+def _combine(patterns):
+	return _PatternSet(patterns) if patterns else None
+
+
+class FileFilter:
+	"""Decides which file names in a folder are notes.
+
+	A name is a note if its extension is one of the file types or it matches an include rule, and it
+	matches no exclude rule. Extensions are looked up in a set, types containing a dot such as tar.gz
+	are checked with one endswith call, and the include or exclude globs are compiled into a single
+	regular expression each, so checking a name costs the same however many glob rules there are.
+	Matching ignores case. Exclude rules also keep subfolders with matching names from being walked.
+	"""
+
+	def __init__(self, fileTypes, rules=(), ignored=()):
+		self.fileTypes = sorted({ext.lower().lstrip(".") for ext in fileTypes})
+		self.rules = list(rules)
+		self.ignored = list(ignored)
+		# identifies the filter in saved folder indexes
+		self.key = [self.fileTypes, self.rules, self.ignored]
+		self._single = {ext for ext in self.fileTypes if "." not in ext}
+		self._dotted = tuple("." + ext for ext in self.fileTypes if "." in ext)
+		includes = []
+		excludes = list(self.ignored)
+		for rule in self.rules:
+			try:
+				include, pattern = parse_rule(rule)
+			except ValueError:
+				continue
+			(includes if include else excludes).append(pattern)
+		self._include = _combine(includes)
+		self._exclude = _combine(excludes)
+
+	def with_ignored(self, patterns):
+		"""This filter with more exclude patterns, such as those of a folder's ignore file."""
+		if not patterns:
+			return self
+		return FileFilter(self.fileTypes, self.rules, self.ignored + list(patterns))
+
+	def excludes(self, name):
+		return self._exclude is not None and self._exclude.match(name)
+
+	def matches(self, name):
+		if self.excludes(name):
+			return False
+		lowered = name.lower()
+		_head, dot, ext = lowered.rpartition(".")
+		if dot and ext in self._single:
+			return True
+		if self._dotted and lowered.endswith(self._dotted):
+			return True
+		return self._include is not None and self._include.match(name)
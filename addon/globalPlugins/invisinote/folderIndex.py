@@ -0,0 +1,332 @@
+import os
+import json
+import stat
+import bisect
+import hashlib
+import threading
+
+from . import fileRules
+from . import noteArchives
+
+INDEX_VERSION = 5
+
+
+def _created_ns(st):
+	# where Python has no st_birthtime_ns, st_ctime_ns is the creation time on Windows
+	return getattr(st, "st_birthtime_ns", None) or st.st_ctime_ns
+
+
+def _mtime_ns(path):
+	try:
+		return os.stat(path).st_mtime_ns
+	except OSError:
+		return None
+
+
+def _entry_of(st, known=None):
+	"""The index entry of a note with stat result st, keeping the encoding known for it at the same stamp."""
+	entry = [st.st_mtime_ns, st.st_size, _created_ns(st)]
+	if known is not None and len(known) > 3 and known[:2] == entry[:2]:
+		entry.append(known[3])
+	return entry
+
+
+class FolderIndex:
+	"""Sorted listing of the notes in one folder, persisted to disk and validated against the folder mtime."""
+
+	def __init__(self, folder, indexFile):
+		self.folder = folder
+		self.indexFile = indexFile
+		self.dirMtime = None
+		# key of the file filter the listing was made with, and the mtime of the folder's ignore file
+		self.filterKey = None
+		self.ignoreMtime = None
+		# name -> [mtime_ns, size, created_ns], plus the detected encoding once the note has been read
+		self.entries = {}
+		self.names = []
+		self._notes = None
+		# sorted names of the subfolders, for walking a folder tree without rescanning it
+		self.subdirs = []
+		# sorted names of the zip archives, which are listed as virtual subfolders
+		self.archives = []
+		self.dirty = False
+		# held while the index is loaded, rescanned or saved; readers of entries do without it
+		self.lock = threading.Lock()
+		self.loaded = False
+
+	def load(self):
+		self.loaded = True
+		try:
+			with open(self.indexFile, "r", encoding="utf-8") as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return
+		if data.get("version") != INDEX_VERSION or data.get("folder") != self.folder:
+			return
+		self.dirMtime = data["dirMtime"]
+		self.filterKey = data["filter"]
+		self.ignoreMtime = data["ignoreMtime"]
+		self.entries = data["entries"]
+		self.names = sorted(self.entries)
+		self._notes = None
+		self.subdirs = data["subdirs"]
+		self.archives = data["archives"]
+
+	def save(self):
+		data = {
+			"version": INDEX_VERSION,
+			"folder": self.folder,
+			"dirMtime": self.dirMtime,
+			"filter": self.filterKey,
+			"ignoreMtime": self.ignoreMtime,
+			"entries": self.entries,
+			"subdirs": self.subdirs,
+			"archives": self.archives,
+		}
+		tmpFile = self.indexFile + ".tmp"
+		try:
+			os.makedirs(os.path.dirname(self.indexFile), exist_ok=True)
+			with open(tmpFile, "w", encoding="utf-8") as f:
+				json.dump(data, f, separators=(",", ":"))
+			os.replace(tmpFile, self.indexFile)
+		except OSError:
+			pass
+		self.dirty = False
+
+	def notes(self):
+		if self._notes is None:
+			self._notes = [os.path.join(self.folder, name) for name in self.names]
+		return self._notes
+
+	def subfolders(self):
+		return [os.path.join(self.folder, name) for name in self.subdirs]
+
+	def archive_paths(self):
+		return [os.path.join(self.folder, name) for name in self.archives]
+
+	def is_current(self, fileFilter):
+		"""Whether the listing was made with fileFilter and the folder's ignore file is unchanged."""
+		if self.dirMtime is None or self.filterKey != fileFilter.key:
+			return False
+		# creating or deleting the ignore file changes the folder mtime, but editing it may not
+		ignoreFile = os.path.join(self.folder, fileRules.IGNORE_FILE)
+		return self.ignoreMtime is None or _mtime_ns(ignoreFile) == self.ignoreMtime
+
+	def refresh(self, fileFilter):
+		"""Bring the index up to date and return the sorted note paths, or None if the folder is missing.
+
+		An unchanged folder costs a single stat, plus one for its ignore file if it has one. A changed
+		folder is rescanned with os.scandir and only the added and removed names are applied to the
+		existing sorted listing. A rescan takes the stats of every note again; notes edited in place,
+		which leaves the folder mtime alone, are brought up to date by update_note and set_encoding.
+		"""
+		try:
+			st = os.stat(self.folder)
+		except OSError:
+			return None
+		if not stat.S_ISDIR(st.st_mode):
+			return None
+		if st.st_mtime_ns == self.dirMtime and self.is_current(fileFilter):
+			if self.dirty:
+				self.save()
+			return self.notes()
+		sameFilter = self.filterKey == fileFilter.key
+		ignoreFile = os.path.join(self.folder, fileRules.IGNORE_FILE)
+		ignoreMtime = _mtime_ns(ignoreFile)
+		folderFilter = fileFilter
+		if ignoreMtime is not None:
+			try:
+				folderFilter = fileFilter.with_ignored(fileRules.read_ignore_file(ignoreFile))
+			except OSError:
+				pass
+		found = {}
+		subdirs = []
+		archives = []
+		with os.scandir(self.folder) as it:
+			for entry in it:
+				try:
+					if entry.is_dir(follow_symlinks=False):
+						if not folderFilter.excludes(entry.name):
+							subdirs.append(entry.name)
+						continue
+				except OSError:
+					continue
+				if entry.name.lower().endswith(noteArchives.ARCHIVE_SUFFIX):
+					if not folderFilter.excludes(entry.name):
+						archives.append(entry.name)
+					continue
+				if not folderFilter.matches(entry.name):
+					continue
+				try:
+					if not entry.is_file():
+						continue
+					# on Windows the stats come with the directory entry, without another call
+					est = entry.stat()
+				except OSError:
+					continue
+				found[entry.name] = _entry_of(est, self.entries.get(entry.name))
+		subdirs.sort()
+		archives.sort()
+		# a rescan that finds nothing new is not written out again
+		changed = not sameFilter or (found, subdirs, archives) != (self.entries, self.subdirs, self.archives)
+		changed = changed or (st.st_mtime_ns, ignoreMtime) != (self.dirMtime, self.ignoreMtime)
+		if sameFilter and ignoreMtime == self.ignoreMtime:
+			self._apply_diff(found)
+		else:
+			self.names = sorted(found)
+			self._notes = None
+		self.entries = found
+		self.subdirs = subdirs
+		self.archives = archives
+		self.dirMtime = st.st_mtime_ns
+		self.filterKey = fileFilter.key
+		self.ignoreMtime = ignoreMtime
+		if changed or self.dirty:
+			self.save()
+		return self.notes()
+
+	def update_note(self, name):
+		"""Take the stats of a listed note again, after it was seen to change."""
+		known = self.entries.get(name)
+		if known is None:
+			return
+		try:
+			entry = _entry_of(os.stat(os.path.join(self.folder, name)), known)
+		except OSError:
+			return
+		if entry != known:
+			self.entries[name] = entry
+			self.dirty = True
+
+	def get_encoding(self, name, stamp):
+		"""Return the encoding remembered for a note, if it was detected when the note had this stamp."""
+		entry = self.entries.get(name)
+		if entry is not None and len(entry) > 3 and entry[0] == stamp[0] and entry[1] == stamp[1]:
+			return entry[3]
+		return None
+
+	def set_encoding(self, name, stamp, encoding):
+		entry = self.entries.get(name)
+		if entry is not None:
+			# the stamp the note was just read with also keeps its modification time current for sorting
+			self.entries[name] = [stamp[0], stamp[1], entry[2], encoding]
+			self.dirty = True
+
+	def _apply_diff(self, found):
+		removed = [name for name in self.entries if name not in found]
+		added = [name for name in found if name not in self.entries]
+		if not removed and not added:
+			return
+		if len(removed) + len(added) > len(self.names) // 4:
+			self.names = sorted(found)
+		else:
+			for name in removed:
+				del self.names[bisect.bisect_left(self.names, name)]
+			for name in added:
+				bisect.insort(self.names, name)
+		self._notes = None
+
+
+class FolderIndexStore:
+	"""In-memory cache of FolderIndex objects, one per configured folder, backed by files in indexDir.
+
+	Safe to use from the background threads that walk the configured folders. Each index has a lock of
+	its own, held while its folder is rescanned, so a slow folder only holds up other listings of that
+	folder; looking up encodings and stats takes no lock at all.
+	"""
+
+	def __init__(self, indexDir):
+		self.indexDir = indexDir
+		self._indexes = {}
+		self._lock = threading.Lock()
+
+	def _index_for(self, folder):
+		"""Return the index of folder; the caller holds its lock and loads it if it is not loaded yet."""
+		key = os.path.normcase(os.path.abspath(folder))
+		with self._lock:
+			index = self._indexes.get(key)
+			if index is None:
+				fileName = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json"
+				index = FolderIndex(folder, os.path.join(self.indexDir, fileName))
+				self._indexes[key] = index
+		return index
+
+	def _index_of_note(self, path):
+		return self._indexes.get(os.path.normcase(os.path.dirname(os.path.abspath(path))))
+
+	def list_notes(self, folder, fileFilter):
+		index = self._index_for(folder)
+		with index.lock:
+			if not index.loaded:
+				index.load()
+			return index.refresh(fileFilter)
+
+	def list_folder(self, folder, fileFilter):
+		"""Return (note paths, subfolder paths, archive paths) of folder, or None if it is missing."""
+		index = self._index_for(folder)
+		with index.lock:
+			if not index.loaded:
+				index.load()
+			notes = index.refresh(fileFilter)
+			return None if notes is None else (notes, index.subfolders(), index.archive_paths())
+
+	def cached_notes(self, folder, fileFilter):
+		"""Return the listing last saved for folder without touching the folder itself, or None."""
+		index = self._index_for(folder)
+		with index.lock:
+			if not index.loaded:
+				index.load()
+			if index.dirMtime is None or index.filterKey != fileFilter.key:
+				return None
+			return index.notes()
+
+	def cached_folder(self, folder, fileFilter):
+		"""Like list_folder, but from what was last saved, without touching the folder itself."""
+		index = self._index_for(folder)
+		with index.lock:
+			if not index.loaded:
+				index.load()
+			if index.dirMtime is None or index.filterKey != fileFilter.key:
+				return None
+			return index.notes(), index.subfolders(), index.archive_paths()
+
+	def get_encoding(self, path, stamp):
+		index = self._index_of_note(path)
+		return index.get_encoding(os.path.basename(path), stamp) if index is not None else None
+
+	def set_encoding(self, path, stamp, encoding):
+		index = self._index_of_note(path)
+		if index is not None:
+			index.set_encoding(os.path.basename(path), stamp, encoding)
+
+	def update_note(self, path):
+		"""Take the stats of a note again, such as after the watcher saw it change in place."""
+		index = self._index_of_note(path)
+		if index is not None:
+			index.update_note(os.path.basename(path))
+
+	def stat_table(self, paths):
+		"""Return {path: (mtime_ns, size, created_ns)} for the notes among paths that an index lists.
+
+		The stats are the ones recorded when the folders were last scanned, so nothing is read from disk.
+		"""
+		table = {}
+		indexes = {}
+		for path in paths:
+			folder, name = os.path.split(path)
+			index = indexes.get(folder, False)
+			if index is False:
+				index = indexes[folder] = self._index_of_note(path)
+			entry = index.entries.get(name) if index is not None else None
+			if entry is not None:
+				table[path] = (entry[0], entry[1], entry[2])
+		return table
+
+	def flush(self):
+		"""Write out indexes whose remembered encodings changed since they were last saved."""
+		with self._lock:
+			indexes = list(self._indexes.values())
+		for index in indexes:
+			with index.lock:
+				if index.dirty:
+					index.save()
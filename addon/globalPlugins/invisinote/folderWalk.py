@@ -0,0 +1,38 @@
+import os
+
+
+def walk_notes(listFolder, folder, fileFilter, maxDepth=0, skip=(), listArchive=None):
+	"""Yield the sorted note paths of folder, then of each of its subfolders in turn, depth first.
+
+	listFolder(path, fileFilter) returns (notes, subfolders, archives) or None, like
+	FolderIndexStore.list_folder. If listArchive is given, the notes it returns for each archive in a
+	folder are yielded after the folder's own notes, as if the archive were a subfolder.
+	Subfolders more than maxDepth levels down, and those whose lowercased name is in skip, are not
+	entered. Nothing is yielded if folder itself is missing; a missing or unreadable subfolder is passed
+	over. Being a generator, the walk can be consumed a folder at a time while it is still going.
+	"""
+	pending = [(folder, 0)]
+	while pending:
+		path, depth = pending.pop()
+		try:
+			listing = listFolder(path, fileFilter)
+		except OSError:
+			if depth == 0:
+				raise
+			# a subfolder that cannot be read, such as a protected one, is passed over like a missing one
+			continue
+		if listing is None:
+			continue
+		notes, subfolders, archives = listing
+		yield notes
+		if listArchive is not None:
+			for archive in archives:
+				members = listArchive(archive, fileFilter)
+				if members:
+					yield members
+		if depth < maxDepth:
+			pending.extend(
+				(subfolder, depth + 1)
+				for subfolder in reversed(subfolders)
+				if os.path.basename(subfolder).lower() not in skip
+			)
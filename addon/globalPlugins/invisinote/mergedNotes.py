@@ -0,0 +1,91 @@
+import os
+import heapq
+import bisect
+from collections.abc import Sequence
+
+
+class MergedNotes(Sequence):
+	"""Read-only list of the notes of several folders, merged by name.
+
+	Each folder's listing is already sorted by name, so the merged order is produced lazily by a k-way
+	merge and only as far as it has been read; nothing is concatenated and sorted. Notes with the same
+	name keep the order of their folders. The length, membership tests and index lookups are answered
+	from the per-folder listings without merging.
+	"""
+
+	def __init__(self, folders, listings):
+		self.folders = list(folders)
+		self.listings = [listing or [] for listing in listings]
+		self._folderKeys = {
+			os.path.normcase(os.path.normpath(folder)): i for i, folder in enumerate(self.folders)
+		}
+		self._names = [None] * len(self.listings)
+		self._length = sum(len(listing) for listing in self.listings)
+		self._merged = []
+		self._merge = heapq.merge(*(self._keyed(i, listing) for i, listing in enumerate(self.listings)))
+
+	@staticmethod
+	def _keyed(folderIndex, listing):
+		for path in listing:
+			yield os.path.basename(path), folderIndex, path
+
+	def _extend(self, count):
+		for _name, _folderIndex, path in self._merge:
+			self._merged.append(path)
+			if len(self._merged) >= count:
+				break
+
+	def __len__(self):
+		return self._length
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(len(self)))]
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError("note index out of range")
+		if index >= len(self._merged):
+			self._extend(index + 1)
+		return self._merged[index]
+
+	def __iter__(self):
+		self._extend(len(self))
+		return iter(self._merged)
+
+	def _names_of(self, folderIndex):
+		names = self._names[folderIndex]
+		if names is None:
+			names = self._names[folderIndex] = [os.path.basename(path) for path in self.listings[folderIndex]]
+		return names
+
+	def folder_index(self, path):
+		"""Index of the folder path is listed in, or None."""
+		folderIndex = self._folderKeys.get(os.path.normcase(os.path.dirname(path)))
+		if folderIndex is None:
+			return None
+		names = self._names_of(folderIndex)
+		name = os.path.basename(path)
+		i = bisect.bisect_left(names, name)
+		if i < len(names) and names[i] == name:
+			return folderIndex
+		return None
+
+	def __contains__(self, path):
+		return isinstance(path, str) and self.folder_index(path) is not None
+
+	def index(self, path):
+		"""Position of path in the merged order, counted from the per-folder listings with bisect."""
+		folderIndex = self.folder_index(path)
+		if folderIndex is None:
+			raise ValueError("{} is not in the merged notes".format(path))
+		name = os.path.basename(path)
+		position = 0
+		for i in range(len(self.listings)):
+			names = self._names_of(i)
+			# notes named alike come from earlier folders first
+			if i < folderIndex:
+				position += bisect.bisect_right(names, name)
+			else:
+				position += bisect.bisect_left(names, name)
+		return position
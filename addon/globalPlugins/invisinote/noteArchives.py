@@ -0,0 +1,133 @@
+import os
+import zlib
+import struct
+import zipfile
+import threading
+
+# archives with this suffix are listed as virtual subfolders of the folder they are in
+ARCHIVE_SUFFIX = ".zip"
+# signature, 22 bytes of fields read from the central directory instead, name and extra field lengths
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_LOCAL_SIGNATURE = b"PK\x03\x04"
+
+
+def split_member(path):
+	"""Split a path such as folder/old.zip/2020/note.txt into (archive path, member name), or return None."""
+	marker = ARCHIVE_SUFFIX + os.sep
+	i = path.lower().find(marker)
+	if i == -1:
+		return None
+	return path[: i + len(ARCHIVE_SUFFIX)], path[i + len(marker) :].replace(os.sep, "/")
+
+
+class ArchiveIndex:
+	"""The members of one zip archive, parsed from its central directory once.
+
+	For each member only what is needed to read it straight from the archive file is kept, so reading a
+	member seeks to its data without opening the archive with zipfile again. Encrypted members and
+	compression methods other than stored and deflated are left to zipfile.
+	"""
+
+	def __init__(self, path, stamp):
+		self.path = path
+		self.stamp = stamp
+		# member name -> (header offset, compression method, compressed size, size, CRC, flags)
+		self.members = {}
+		with zipfile.ZipFile(path) as archive:
+			for info in archive.infolist():
+				if not info.filename.endswith("/"):
+					self.members[info.filename] = (
+						info.header_offset,
+						info.compress_type,
+						info.compress_size,
+						info.file_size,
+						info.CRC,
+						info.flag_bits,
+					)
+		self.names = sorted(self.members)
+		self._notes = {}
+
+	def notes(self, fileFilter):
+		"""Paths of the members that are notes according to fileFilter, by member name."""
+		key = repr(fileFilter.key)
+		notes = self._notes.get(key)
+		if notes is None:
+			notes = self._notes[key] = [
+				os.path.join(self.path, *name.split("/"))
+				for name in self.names
+				if fileFilter.matches(name.rpartition("/")[2])
+			]
+		return notes
+
+	def read(self, name):
+		headerOffset, method, compressSize, size, crc, flags = self.members[name]
+		if flags & 0x1 or method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+			with zipfile.ZipFile(self.path) as archive:
+				return archive.read(name)
+		with open(self.path, "rb") as f:
+			f.seek(headerOffset)
+			signature, nameLength, extraLength = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+			if signature != _LOCAL_SIGNATURE:
+				raise zipfile.BadZipFile("bad local header for " + name)
+			f.seek(nameLength + extraLength, os.SEEK_CUR)
+			data = f.read(compressSize)
+		if method == zipfile.ZIP_DEFLATED:
+			data = zlib.decompress(data, -15)
+		if len(data) != size or zlib.crc32(data) != crc:
+			raise zipfile.BadZipFile("bad CRC for " + name)
+		return data
+
+
+class ArchiveStore:
+	"""Cache of ArchiveIndex objects, revalidated against each archive's mtime and size.
+
+	Safe to use from the background threads that list folders and read notes.
+	"""
+
+	def __init__(self):
+		self._archives = {}
+		self._lock = threading.Lock()
+
+	def _index_for(self, archivePath):
+		st = os.stat(archivePath)
+		stamp = (st.st_mtime_ns, st.st_size)
+		key = os.path.normcase(os.path.abspath(archivePath))
+		with self._lock:
+			index = self._archives.get(key)
+			if index is None or index.stamp != stamp:
+				try:
+					index = ArchiveIndex(archivePath, stamp)
+				except (zipfile.BadZipFile, zipfile.LargeZipFile) as e:
+					raise OSError(_("Damaged archive: {}").format(os.path.basename(archivePath))) from e
+				self._archives[key] = index
+			return index
+
+	def list_notes(self, archivePath, fileFilter):
+		"""Return the paths of the notes in an archive, or None if it cannot be read."""
+		try:
+			return self._index_for(archivePath).notes(fileFilter)
+		except OSError:
+			return None
+
+	def is_member(self, path):
+		member = split_member(path)
+		return member is not None and os.path.isfile(member[0])
+
+	def _member(self, path):
+		archivePath, name = split_member(path)
+		index = self._index_for(archivePath)
+		if name not in index.members:
+			raise FileNotFoundError(_("Not in archive: {}").format(name))
+		return index, name
+
+	def member_stamp(self, path):
+		"""(mtime_ns, size) of a member: the archive's mtime, which changes with any of its members."""
+		index, name = self._member(path)
+		return (index.stamp[0], index.members[name][3])
+
+	def read_member(self, path):
+		index, name = self._member(path)
+		try:
+			return index.read(name)
+		except (zipfile.BadZipFile, zlib.error) as e:
+			raise OSError(_("Damaged archive member: {}").format(name)) from e
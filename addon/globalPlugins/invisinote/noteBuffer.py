@@ -0,0 +1,155 @@
+import mmap
+import bisect
+import contextlib
+from array import array
+from collections.abc import Sequence
+
+from . import textEncoding
+
+# Notes at least this large are paged from a memory map instead of being decoded up front.
+PAGED_THRESHOLD = 4 * 1024 * 1024
+# bytes of lines decoded at a time when iterating over a paged note
+ITER_BLOCK = 1024 * 1024
+
+
+def map_file(f):
+	"""Return a read-only memory map of an open file, or b"" for an empty file, which cannot be mapped."""
+	try:
+		return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+	except ValueError:
+		return b""
+
+
+def _close_map(data):
+	if isinstance(data, mmap.mmap):
+		try:
+			data.close()
+		except BufferError:
+			# a search or outline build on another thread still holds the map, which goes when it is collected
+			pass
+
+
+@contextlib.contextmanager
+def mapped_file(path):
+	"""Map a file with map_file for the length of a with block."""
+	with open(path, "rb") as f:
+		data = map_file(f)
+		try:
+			yield data
+		finally:
+			_close_map(data)
+
+
+class PagedLines(Sequence):
+	"""Read-only list of the lines of a large note, decoded on demand.
+
+	Only an array of line start offsets is kept in memory; each line is sliced out of a memory-mapped
+	view of the file and decoded when it is accessed. Lines keep their line endings, like
+	str.splitlines(keepends=True), but only "\\n" is treated as a line break, so the encoding must be
+	one where that is a single byte (see textEncoding.is_ascii_compatible).
+	"""
+
+	def __init__(self, path, encoding="utf-8"):
+		self.path = path
+		self.encoding = encoding
+		self._file = open(path, "rb")
+		self._map = map_file(self._file)
+		self._offsets = self._build_offsets(self._map)
+
+	@staticmethod
+	def _build_offsets(data, offsets=None):
+		"""Add the starts of the lines of data after the last offset, and the end of data."""
+		if offsets is None:
+			offsets = array("Q", [0])
+		find = data.find
+		pos = find(b"\n", offsets[-1])
+		while pos != -1:
+			offsets.append(pos + 1)
+			pos = find(b"\n", pos + 1)
+		if offsets[-1] != len(data):
+			offsets.append(len(data))
+		return offsets
+
+	def _decode(self, raw):
+		try:
+			return raw.decode(self.encoding)
+		except UnicodeDecodeError:
+			return raw.decode(textEncoding.FALLBACK_ENCODING)
+
+	def __len__(self):
+		return len(self._offsets) - 1
+
+	@property
+	def nbytes(self):
+		"""Memory held by the line index; the mapped file itself is not counted."""
+		return self._offsets.itemsize * len(self._offsets)
+
+	@property
+	def data(self):
+		"""The raw bytes of the note, for scanning it without decoding every line."""
+		return self._map
+
+	def line_at(self, offset):
+		"""Index of the line containing byte offset."""
+		return bisect.bisect_right(self._offsets, offset) - 1
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(len(self)))]
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError("line index out of range")
+		return self._decode(self._map[self._offsets[index] : self._offsets[index + 1]])
+
+	def __iter__(self):
+		# whole blocks of lines are decoded at once; "\n" is a single byte that is never part of another
+		# character, so this gives the same lines as decoding each one
+		offsets = self._offsets
+		count = len(self)
+		i = 0
+		while i < count:
+			j = bisect.bisect_left(offsets, offsets[i] + ITER_BLOCK, i + 1, count)
+			try:
+				text = self._map[offsets[i] : offsets[j]].decode(self.encoding)
+			except UnicodeDecodeError:
+				text = None
+			if text is None or "\n\ufeff" in text:
+				# a line that only decodes with the fallback encoding, or one starting with a byte order
+				# mark, which utf-8-sig drops at the start of each line decoded on its own
+				for k in range(i, j):
+					yield self[k]
+			else:
+				parts = text.split("\n")
+				for part in parts[:-1]:
+					yield part + "\n"
+				if parts[-1]:
+					yield parts[-1]
+			i = j
+
+	def grow(self):
+		"""Map what has been appended to the file since it was mapped.
+
+		Returns the index of the first line that changed, or None if the file has not grown. Only the
+		appended bytes are scanned for line breaks; a last line that had no line break yet is rescanned.
+		"""
+		try:
+			newMap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			return None
+		if len(newMap) <= len(self._map):
+			newMap.close()
+			return None
+		oldMap = self._map
+		if oldMap and oldMap[-1:] != b"\n":
+			# the end of an unfinished last line, which the appended bytes continue
+			self._offsets.pop()
+		first = len(self._offsets) - 1
+		self._map = newMap
+		self._build_offsets(newMap, self._offsets)
+		_close_map(oldMap)
+		return first
+
+	def close(self):
+		_close_map(self._map)
+		self._file.close()
@@ -0,0 +1,104 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from . import noteBuffer
+
+# paged notes kept at most, as each holds its file open and mapped however small its line index is
+MAX_PAGED = 4
+
+
+def estimate_size(lines):
+	"""Approximate number of bytes of memory held by a note's lines."""
+	if isinstance(lines, noteBuffer.PagedLines):
+		return lines.nbytes
+	return sys.getsizeof(lines) + sum(sys.getsizeof(line) for line in lines)
+
+
+class NoteCache:
+	"""Least-recently-used cache of decoded notes, bounded by an approximate memory budget in bytes.
+
+	Entries are keyed by path and validated against a (mtime_ns, size) stamp, so a note that changed on
+	disk is never served from the cache. The most recently stored note is always kept, even if it alone
+	exceeds the budget. Paged notes are also limited to MAX_PAGED, since their cost in memory leaves out
+	the open file and the mapping behind them.
+
+	evicted, if given, is called with the lines of each note dropped or replaced, from whichever thread
+	stored or cleared, so that paged notes can be closed once nothing else uses them.
+	"""
+
+	def __init__(self, budget, evicted=None):
+		self.budget = budget
+		self.hits = 0
+		self.misses = 0
+		self.used = 0
+		self.paged = 0
+		self._evicted = evicted
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def lookup(self, path, stamp):
+		"""Return the cached lines for path if they match stamp, counting a hit or a miss."""
+		with self._lock:
+			entry = self._entries.get(path)
+			if entry is not None and entry[0] == stamp:
+				self._entries.move_to_end(path)
+				self.hits += 1
+				return entry[1]
+			self.misses += 1
+			return None
+
+	def contains(self, path, stamp):
+		with self._lock:
+			entry = self._entries.get(path)
+			return entry is not None and entry[0] == stamp
+
+	def stamp_of(self, path, lines):
+		"""Return the stamp lines are cached under for path, or None if those lines are not cached."""
+		with self._lock:
+			entry = self._entries.get(path)
+			return entry[0] if entry is not None and entry[1] is lines else None
+
+	def _remove(self, path):
+		_stamp, lines, cost = self._entries.pop(path)
+		self.used -= cost
+		if isinstance(lines, noteBuffer.PagedLines):
+			self.paged -= 1
+		return lines
+
+	def _release(self, dropped):
+		if self._evicted is not None:
+			for lines in dropped:
+				self._evicted(lines)
+
+	def store(self, path, stamp, lines):
+		cost = estimate_size(lines)
+		dropped = []
+		with self._lock:
+			if path in self._entries:
+				old = self._remove(path)
+				if old is not lines:
+					dropped.append(old)
+			self._entries[path] = (stamp, lines, cost)
+			self.used += cost
+			if isinstance(lines, noteBuffer.PagedLines):
+				self.paged += 1
+			while self.paged > MAX_PAGED:
+				oldest = next(
+					key for key, entry in self._entries.items() if isinstance(entry[1], noteBuffer.PagedLines)
+				)
+				dropped.append(self._remove(oldest))
+			while self.used > self.budget and len(self._entries) > 1:
+				dropped.append(self._remove(next(iter(self._entries))))
+		self._release(dropped)
+
+	def clear(self):
+		with self._lock:
+			dropped = [entry[1] for entry in self._entries.values()]
+			self._entries.clear()
+			self.used = 0
+			self.paged = 0
+		self._release(dropped)
+
+	def __len__(self):
+		return len(self._entries)
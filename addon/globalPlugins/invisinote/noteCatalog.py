@@ -0,0 +1,193 @@
+import os
+import re
+import json
+
+from . import backgroundRefresh
+from . import noteBuffer
+from . import textEncoding
+
+CATALOG_VERSION = 1
+# notes are counted a block at a time, so a huge note is never copied out of its memory map whole
+COUNT_BLOCK = 1024 * 1024
+# longest first heading kept in the catalog, in characters
+MAX_HEADING = 200
+
+# the text of a markdown heading ("# Title"), without its closing hashes
+_HEADING_RE = re.compile(r"^ {0,3}#{1,6}[ \t]+(.*?)(?:[ \t]+#+)?[ \t\r]*$", re.M)
+# over raw bytes the first line may start with a UTF-8 byte order mark
+_HEADING_BYTES_RE = re.compile(rb"^(?:\xef\xbb\xbf)? {0,3}#{1,6}[ \t]+(.*?)(?:[ \t]+#+)?[ \t\r]*$", re.M)
+
+
+def format_size(size):
+	if size < 1024:
+		return _("{} bytes").format(size)
+	if size < 1024 * 1024:
+		return _("{:.1f} KB").format(size / 1024)
+	return _("{:.1f} MB").format(size / (1024 * 1024))
+
+
+class NoteStats:
+	"""What the catalog knows about one note, as of the (mtime_ns, size) stamp it was counted at."""
+
+	__slots__ = ("stamp", "lines", "words", "encoding", "heading")
+
+	def __init__(self, stamp, lines, words, encoding, heading):
+		self.stamp = stamp
+		self.lines = lines
+		self.words = words
+		self.encoding = encoding
+		# the text of the note's first markdown heading, or None if it has none
+		self.heading = heading
+
+	@property
+	def size(self):
+		return self.stamp[1]
+
+
+def _count_text(text):
+	lines = text.count("\n") + (1 if text and not text.endswith("\n") else 0)
+	m = _HEADING_RE.search(text)
+	return lines, len(text.split()), m.group(1) if m is not None else None
+
+
+def _count_bytes(data, encoding):
+	start = len(textEncoding.bom_of(data[:4]))
+	newlines = 0
+	words = 0
+	# whether the block before ended inside a word, which the next block then continues
+	inWord = False
+	for pos in range(start, len(data), COUNT_BLOCK):
+		block = data[pos : pos + COUNT_BLOCK]
+		newlines += block.count(b"\n")
+		words += len(block.split())
+		if inWord and not block[:1].isspace():
+			words -= 1
+		inWord = not block[-1:].isspace()
+	lines = newlines + (1 if len(data) > start and data[-1:] != b"\n" else 0)
+	m = _HEADING_BYTES_RE.search(data)
+	heading = m.group(1).decode(encoding, "replace") if m is not None else None
+	return lines, words, heading
+
+
+def count_data(data):
+	"""Return (lines, words, encoding, first heading) of the bytes of a note, or a memory map of it.
+
+	Notes in an encoding where a line break is a single byte are counted without being decoded; others,
+	such as UTF-16 ones, are decoded first.
+	"""
+	encoding = textEncoding.detect(data[: textEncoding.SAMPLE_SIZE])
+	if textEncoding.is_ascii_compatible(encoding):
+		lines, words, heading = _count_bytes(data, encoding)
+	else:
+		text, encoding = textEncoding.decode(bytes(data), encoding)
+		lines, words, heading = _count_text(text)
+	if heading is not None:
+		heading = heading[:MAX_HEADING]
+	return lines, words, encoding, heading
+
+
+def count_file(path):
+	with noteBuffer.mapped_file(path) as data:
+		return count_data(data)
+
+
+class NoteCatalog(backgroundRefresh.BackgroundRefresh):
+	"""Line and word counts, encodings and first headings of the notes in the configured folders.
+
+	The catalog is brought up to date on a background thread, like the search index: only notes whose
+	mtime or size changed since they were counted are read again, and notes no longer listed are
+	dropped. It is saved to catalogFile after each refresh that changed it and loaded by the first one,
+	so looking a note up never touches the disk.
+	"""
+
+	threadName = "invisinote catalog"
+
+	def __init__(self, catalogFile, listNotes, noteStamps, readArchived=None):
+		super().__init__(listNotes, noteStamps)
+		self.catalogFile = catalogFile
+		# readArchived(path) returns the bytes of a note in an archive, or None for any other note
+		self._readArchived = readArchived
+		self._entries = {}
+		self._loaded = False
+
+	def lookup(self, path, stamp=None):
+		"""Return the NoteStats of a note, or None if it has not been counted at this stamp.
+
+		Without a stamp the last counted stats are returned, however old.
+		"""
+		entry = self._entries.get(path)
+		if entry is not None and stamp is not None and entry.stamp != stamp:
+			return None
+		return entry
+
+	def count_note(self, path, stamp):
+		"""Count a note at this (mtime_ns, size) stamp now, keeping the result, and return its NoteStats."""
+		data = self._readArchived(path) if self._readArchived is not None else None
+		counts = count_data(data) if data is not None else count_file(path)
+		entry = NoteStats(tuple(stamp), *counts)
+		with self._lock:
+			self._entries[path] = entry
+		return entry
+
+	def _update(self, folders, fileFilter):
+		if not self._loaded:
+			self._load()
+		changed = super()._update(folders, fileFilter)
+		if changed:
+			self._save()
+		return changed
+
+	def _known_stamp(self, path):
+		known = self._entries.get(path)
+		return known.stamp if known is not None else None
+
+	def _note_changed(self, path, stamp):
+		try:
+			self.count_note(path, stamp)
+		except OSError:
+			return False
+		return True
+
+	def _notes_removed(self, seen):
+		with self._lock:
+			removed = [path for path in self._entries if path not in seen]
+			for path in removed:
+				del self._entries[path]
+		return bool(removed)
+
+	def _load(self):
+		self._loaded = True
+		try:
+			with open(self.catalogFile, "r", encoding="utf-8") as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return
+		if not isinstance(data, dict) or data.get("version") != CATALOG_VERSION:
+			return
+		try:
+			entries = {
+				path: NoteStats((mtime, size), lines, words, encoding, heading)
+				for path, (mtime, size, lines, words, encoding, heading) in data["notes"].items()
+			}
+		except (KeyError, TypeError, ValueError):
+			return
+		with self._lock:
+			# notes counted on request while the file was being read are newer than what it holds
+			entries.update(self._entries)
+			self._entries = entries
+
+	def _save(self):
+		with self._lock:
+			notes = {
+				path: [e.stamp[0], e.stamp[1], e.lines, e.words, e.encoding, e.heading]
+				for path, e in self._entries.items()
+			}
+		data = {"version": CATALOG_VERSION, "notes": notes}
+		tmpFile = self.catalogFile + ".tmp"
+		try:
+			os.makedirs(os.path.dirname(self.catalogFile), exist_ok=True)
+			with open(tmpFile, "w", encoding="utf-8") as f:
+				json.dump(data, f, separators=(",", ":"))
+			os.replace(tmpFile, self.catalogFile)
+		except OSError:
+			pass
@@ -0,0 +1,65 @@
+import bisect
+import difflib
+from array import array
+
+# changed regions longer than this many lines are treated as replaced outright instead of being diffed
+MAX_DIFF_LINES = 20000
+
+
+class LineMap:
+	"""Maps line numbers of an old copy of a note to the new copy, from a line-level diff.
+
+	Lines the two copies share keep their place relative to each other. A line that was changed or
+	deleted maps to the same distance into the changed region of the new copy, or to the line just
+	after the region if it has become shorter.
+	"""
+
+	def __init__(self, blocks, newLength):
+		# matching blocks as (old start, new start, size), ending with (old length, new length, 0)
+		self._oldStarts = array("L", (block[0] for block in blocks))
+		self._newStarts = array("L", (block[1] for block in blocks))
+		self._sizes = array("L", (block[2] for block in blocks))
+		self._newLength = newLength
+
+	@classmethod
+	def between(cls, oldLines, newLines):
+		"""Diff two copies of a note's lines.
+
+		The lines both copies start and end with are matched first, so the usual small edit only has
+		difflib look at the lines around it.
+		"""
+		oldLength = len(oldLines)
+		newLength = len(newLines)
+		prefix = 0
+		limit = min(oldLength, newLength)
+		while prefix < limit and oldLines[prefix] == newLines[prefix]:
+			prefix += 1
+		suffix = 0
+		limit -= prefix
+		while suffix < limit and oldLines[oldLength - suffix - 1] == newLines[newLength - suffix - 1]:
+			suffix += 1
+		blocks = [(0, 0, prefix)]
+		oldMiddle = oldLines[prefix : oldLength - suffix]
+		newMiddle = newLines[prefix : newLength - suffix]
+		if oldMiddle and newMiddle and max(len(oldMiddle), len(newMiddle)) <= MAX_DIFF_LINES:
+			matcher = difflib.SequenceMatcher(None, oldMiddle, newMiddle)
+			for oldStart, newStart, size in matcher.get_matching_blocks():
+				if size:
+					blocks.append((prefix + oldStart, prefix + newStart, size))
+		blocks.append((oldLength - suffix, newLength - suffix, suffix))
+		blocks.append((oldLength, newLength, 0))
+		return cls(blocks, newLength)
+
+	def line(self, index):
+		"""Return the line number in the new copy of line index of the old copy."""
+		block = bisect.bisect_right(self._oldStarts, index) - 1
+		oldStart = self._oldStarts[block]
+		offset = index - oldStart
+		if offset < self._sizes[block]:
+			return self._newStarts[block] + offset
+		# in the changed region between this block and the next one
+		regionStart = self._newStarts[block] + self._sizes[block]
+		regionEnd = self._newStarts[block + 1] if block + 1 < len(self._newStarts) else self._newLength
+		changed = index - (oldStart + self._sizes[block])
+		target = regionStart + changed if regionStart + changed < regionEnd else regionEnd
+		return min(target, max(0, self._newLength - 1))
@@ -0,0 +1,133 @@
+import os
+import re
+import bisect
+from array import array
+
+import wx
+
+# candidates shown in the jump to note list
+MAX_SHOWN = 50
+
+
+def _subsequence_re(query):
+	# starting with a literal lets the search skip to candidate positions, and each later step jumps
+	# to the next wanted character without backtracking, so a failed match costs one pass over the name
+	rest = "".join("[^\\n{0}]*{0}".format(re.escape(char)) for char in query[1:])
+	return re.compile(re.escape(query[0]) + rest)
+
+
+class NameIndex:
+	"""Prefix and fuzzy lookup over the basenames of a note listing.
+
+	Prefix matches come from binary search over the sorted lowercased names, which yields the same
+	prefix ranges as a trie without a node per character. Fuzzy matches are names containing the
+	query's characters in order; they are found with one regular expression over all names joined
+	into a single string, stopping once enough matches have been found. Whenever a scan reaches the
+	end, its matches are kept as a smaller joined string that later, longer queries scan instead, so
+	each keystroke narrows the candidates left by the previous one.
+	"""
+
+	def __init__(self, notes):
+		self.notes = notes
+		self.names = [os.path.basename(path).lower().replace("\n", " ") for path in notes]
+		order = sorted(range(len(self.names)), key=self.names.__getitem__)
+		self._sortedNames = [self.names[i] for i in order]
+		self._sortedIds = array("L", order)
+		self._chars = set()
+		for name in self.names:
+			self._chars.update(name)
+		self._subsets = {"": self._make_subset(range(len(self.names)))}
+
+	def _make_subset(self, ids):
+		starts = array("L", [0])
+		for noteId in ids:
+			starts.append(starts[-1] + len(self.names[noteId]) + 1)
+		blob = "".join(self.names[noteId] + "\n" for noteId in ids)
+		return blob, starts, array("L", ids)
+
+	def prefix_matches(self, query, limit):
+		start = bisect.bisect_left(self._sortedNames, query)
+		ids = []
+		for i in range(start, min(start + limit, len(self._sortedNames))):
+			if not self._sortedNames[i].startswith(query):
+				break
+			ids.append(self._sortedIds[i])
+		return ids
+
+	def fuzzy_matches(self, query, limit):
+		"""Return (ids of up to limit notes matching query in listing order, whether that is all of them)."""
+		if not self._chars.issuperset(query):
+			return [], True
+		base = next(query[:n] for n in range(len(query), -1, -1) if query[:n] in self._subsets)
+		blob, starts, ids = self._subsets[base]
+		if base == query:
+			return list(ids[:limit]), len(ids) <= limit
+		pattern = _subsequence_re(query)
+		found = []
+		pos = 0
+		while len(found) < limit:
+			m = pattern.search(blob, pos)
+			if m is None:
+				break
+			line = bisect.bisect_right(starts, m.start()) - 1
+			found.append(ids[line])
+			pos = starts[line + 1]
+		else:
+			if pattern.search(blob, pos) is not None:
+				return found, False
+		if len(self._subsets) > 256:
+			self._subsets = {"": self._subsets[""]}
+		self._subsets[query] = self._make_subset(found)
+		return found, True
+
+	def matches(self, query, limit=MAX_SHOWN):
+		"""Return (note ids with prefix matches first, whether every fuzzy match is included)."""
+		query = query.lower()
+		fuzzy, complete = self.fuzzy_matches(query, limit)
+		if not query:
+			return fuzzy, complete
+		shown = self.prefix_matches(query, limit)
+		prefixIds = set(shown)
+		shown.extend(noteId for noteId in fuzzy if noteId not in prefixIds)
+		return shown[:limit], complete and len(shown) <= limit
+
+
+class NoteFinderDialog(wx.Dialog):
+	def __init__(self, parent, nameIndex):
+		super().__init__(parent, title=_("Jump to note"))
+		self._index = nameIndex
+		self._shown = []
+		main_sizer = wx.BoxSizer(wx.VERTICAL)
+		main_sizer.Add(wx.StaticText(self, label=_("Note name:")), flag=wx.LEFT | wx.TOP, border=5)
+		self._query = wx.TextCtrl(self)
+		main_sizer.Add(self._query, flag=wx.EXPAND | wx.ALL, border=5)
+		self._count = wx.StaticText(self)
+		main_sizer.Add(self._count, flag=wx.LEFT | wx.RIGHT, border=5)
+		self._list = wx.ListBox(self)
+		main_sizer.Add(self._list, proportion=1, flag=wx.EXPAND | wx.ALL, border=5)
+		main_sizer.Add(self.CreateButtonSizer(wx.OK | wx.CANCEL), flag=wx.ALL, border=5)
+		self.SetSizer(main_sizer)
+		self.Fit()
+		self._query.Bind(wx.EVT_TEXT, self._on_text)
+		self._list.Bind(wx.EVT_LISTBOX_DCLICK, lambda event: self.EndModal(wx.ID_OK))
+		self._update("")
+
+	def _on_text(self, event):
+		self._update(self._query.GetValue())
+
+	def _update(self, query):
+		self._shown, complete = self._index.matches(query)
+		if complete:
+			self._count.SetLabel(_("{} matching notes").format(len(self._shown)))
+		else:
+			self._count.SetLabel(_("More than {} matching notes").format(len(self._shown)))
+		self._list.Set([os.path.basename(self._index.notes[noteId]) for noteId in self._shown])
+		if self._shown:
+			self._list.SetSelection(0)
+
+	def get_note_index(self):
+		"""Index in the note listing of the chosen note, or None."""
+		idx = self._list.GetSelection()
+		if idx == wx.NOT_FOUND or idx >= len(self._shown):
+			return None
+		return self._shown[idx]
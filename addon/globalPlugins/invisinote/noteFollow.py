@@ -0,0 +1,80 @@
+import os
+import codecs
+
+from . import noteBuffer
+from . import textEncoding
+
+# returned by NoteFollower.read_appended when the note is now shorter than what was already read
+REPLACED = "replaced"
+
+
+def append_text(lines, text):
+	"""Add text to the end of a note's lines, continuing its last line if that had no line break yet.
+
+	Returns the index of the first line that changed, or None if text is empty.
+	"""
+	if not text:
+		return None
+	first = len(lines)
+	if lines and not lines[-1].endswith("\n"):
+		# rejoined and split again, so a "\r\n" split across two reads stays one line break
+		first -= 1
+		text = lines.pop() + text
+	lines.extend(text.splitlines(keepends=True))
+	return first
+
+
+class NoteFollower:
+	"""Reads what has been appended to a note since it was loaded, as a log viewer follows a log.
+
+	Only the bytes past the remembered offset are read. They are decoded with an incremental decoder
+	whose state is carried from one read to the next, so a character split across two reads is not
+	garbled. read_appended does not change the follower and may run in the background; its result is
+	applied with commit on the main thread, so a read whose result is dropped is simply read again.
+	Paged notes decode their own lines, so for them only the note's size is tracked.
+	"""
+
+	def __init__(self, path, lines, stamp, encoding=None):
+		self.path = path
+		# the lines being added to, so a follower is replaced when another note is shown
+		self.lines = lines
+		self.paged = isinstance(lines, noteBuffer.PagedLines)
+		self.stamp = stamp
+		self.offset = stamp[1]
+		self.encoding = encoding
+		self._state = None
+
+	def _decoder(self, f, encoding):
+		decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+		if self._state is not None:
+			decoder.setstate(self._state)
+		elif self.offset:
+			# UTF-16 and UTF-32 take their byte order from the BOM at the start of the file
+			f.seek(0)
+			decoder.decode(textEncoding.bom_of(f.read(4)))
+		return decoder
+
+	def read_appended(self):
+		"""Return None if the note is unchanged, REPLACED if it shrank, or the value to pass to commit.
+
+		That value is (stamp, appended text, new offset, encoding, decoder state); the text is None for
+		a paged note.
+		"""
+		st = os.stat(self.path)
+		stamp = (st.st_mtime_ns, st.st_size)
+		if stamp == self.stamp:
+			return None
+		if stamp[1] < self.offset:
+			return REPLACED
+		if self.paged:
+			return stamp, None, stamp[1], None, None
+		encoding = self.encoding or textEncoding.sniff_file(self.path)
+		with open(self.path, "rb") as f:
+			decoder = self._decoder(f, encoding)
+			f.seek(self.offset)
+			data = f.read(stamp[1] - self.offset)
+		text = decoder.decode(data)
+		return stamp, text, self.offset + len(data), encoding, decoder.getstate()
+
+	def commit(self, appended):
+		self.stamp, _text, self.offset, self.encoding, self._state = appended
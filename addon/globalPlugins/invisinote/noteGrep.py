@@ -0,0 +1,93 @@
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from . import noteBuffer
+
+# notes searched at the same time; reads overlap while one note waits on the disk or the network
+GREP_WORKERS = 4
+# notes handed to the workers ahead of the one whose matches are reported next
+_AHEAD = GREP_WORKERS * 4
+# characters str.splitlines breaks lines at, one of which ends each line but the last
+_LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def _without_break(line):
+	if line.endswith("\r\n"):
+		return line[:-2]
+	if line and line[-1] in _LINE_BREAKS:
+		return line[:-1]
+	return line
+
+
+class NoteGrep:
+	"""One-off regular expression search over note files, reporting the lines that match.
+
+	Each note is read into the lines the view shows for it, decoded in full or paged like the view does,
+	and the pattern is searched for in each line without its line break, so line numbers, case folding
+	and what . or \\w match are the same as on the decoded text. The pattern ignores case.
+	"""
+
+	def __init__(self, pattern, maxHits, readLines):
+		# raises re.error for a pattern that does not compile
+		self.regex = re.compile(pattern, re.IGNORECASE)
+		self.maxHits = maxHits
+		# readLines(path) returns the lines of a note as the view shows them, with their line breaks
+		self._readLines = readLines
+
+	def search_note(self, path):
+		"""Return the indexes of the lines of a note that match, at most maxHits of them."""
+		lines = self._readLines(path)
+		search = self.regex.search
+		matches = []
+		try:
+			for lineIndex, line in enumerate(lines):
+				if search(_without_break(line)):
+					matches.append(lineIndex)
+					if len(matches) >= self.maxHits:
+						break
+		finally:
+			if isinstance(lines, noteBuffer.PagedLines):
+				lines.close()
+		return matches
+
+	def run(self, report, paths):
+		"""Search paths on a pool of threads, passing each note's matches to report in path order.
+
+		Matches are reported as lists of (path, line index). The search stops once maxHits matches
+		have been reported, or when report returns False, which it is also called with an empty list now
+		and then to find out. Returns whether the search stopped early.
+		"""
+		paths = iter(paths)
+		pending = deque()
+		hits = 0
+		quiet = 0
+		with ThreadPoolExecutor(max_workers=GREP_WORKERS, thread_name_prefix="invisinote grep") as executor:
+			try:
+				while True:
+					while len(pending) < _AHEAD:
+						path = next(paths, None)
+						if path is None:
+							break
+						pending.append((path, executor.submit(self.search_note, path)))
+					if not pending:
+						return False
+					path, future = pending.popleft()
+					try:
+						lines = future.result()
+					except OSError:
+						# a note removed or locked since it was listed
+						continue
+					batch = [(path, lineIndex) for lineIndex in lines[: self.maxHits - hits]]
+					quiet = 0 if batch else quiet + 1
+					if batch or quiet >= _AHEAD:
+						# after a run of notes without matches, an empty report asks if the search is wanted
+						quiet = 0
+						if not report(batch):
+							return True
+					hits += len(batch)
+					if hits >= self.maxHits:
+						return True
+			finally:
+				for _path, future in pending:
+					future.cancel()
@@ -0,0 +1,131 @@
+import re
+import bisect
+import codecs
+from array import array
+
+from . import noteBuffer
+from . import textEncoding
+
+# markdown ATX headings ("# Title") and setext underlines ("===" or "---" below a line of text)
+_HEADING_RE = re.compile(r" {0,3}#{1,6}(?:\s|$)")
+_SETEXT_RE = re.compile(r" {0,3}(?:=+|-+)\s*$")
+# the same rules over the raw bytes of a paged note, where "^" and "$" match at "\n"
+_HEADING_BYTES_RE = re.compile(rb"^ {0,3}#{1,6}(?:[ \t\r]|$)", re.M)
+_SETEXT_BYTES_RE = re.compile(
+	rb"^(?! {0,3}#{1,6}(?:[ \t\r]|$))(?! {0,3}(?:=+|-+)[ \t\r]*$)[ \t]*[^\s][^\n]*\n {0,3}(?:=+|-+)[ \t\r]*$",
+	re.M,
+)
+# a non-blank line at the start of the note or after a blank line; the match ends where it starts
+_PARAGRAPH_BYTES_RE = re.compile(rb"(?:\A(?:[ \t\r]*\n)*|\n[ \t\r]*\n)(?=[ \t\r]*[^\s])")
+# paged notes are scanned a block of lines at a time so that the GIL is let go between blocks
+SCAN_BLOCK = 1024 * 1024
+
+
+def _compile_marker(pattern, encoding=None):
+	if not pattern:
+		return None
+	try:
+		if encoding is None:
+			return re.compile(pattern)
+		# encoding with utf-8-sig would put a byte order mark in front of the pattern
+		if codecs.lookup(encoding).name == "utf-8-sig":
+			encoding = "utf-8"
+		return re.compile(pattern.encode(encoding), re.M)
+	except (re.error, UnicodeEncodeError):
+		return None
+
+
+class Outline:
+	"""Sorted line numbers of a note's headings and paragraph starts, searchable with bisect.
+
+	Headings are markdown headings plus any line matching the marker pattern from the options, such as
+	the timestamps of a log. Paragraphs start at each non-blank line that follows a blank one.
+	"""
+
+	def __init__(self, headings, paragraphs):
+		self.headings = headings
+		self.paragraphs = paragraphs
+
+	@staticmethod
+	def next_after(starts, lineIndex):
+		"""First line in starts after lineIndex, or None."""
+		i = bisect.bisect_right(starts, lineIndex)
+		return starts[i] if i < len(starts) else None
+
+	@staticmethod
+	def previous_before(starts, lineIndex):
+		"""Last line in starts before lineIndex, or None."""
+		i = bisect.bisect_left(starts, lineIndex) - 1
+		return starts[i] if i >= 0 else None
+
+
+def _build_from_lines(lines, marker):
+	headings = array("L")
+	paragraphs = array("L")
+	previousBlank = True
+	# whether the previous line is plain text that a setext underline turns into a heading
+	previousText = False
+	for i, line in enumerate(lines):
+		if not line.strip():
+			previousBlank = True
+			previousText = False
+			continue
+		if previousBlank:
+			paragraphs.append(i)
+		isHeading = _HEADING_RE.match(line) is not None
+		isUnderline = _SETEXT_RE.match(line) is not None
+		if isUnderline and previousText and not (headings and headings[-1] == i - 1):
+			headings.append(i - 1)
+		if isHeading or (marker is not None and marker.search(line)):
+			headings.append(i)
+		previousBlank = False
+		previousText = not isHeading and not isUnderline
+	return Outline(headings, paragraphs)
+
+
+def _line_end(data, pos):
+	end = data.find(b"\n", pos)
+	return len(data) if end == -1 else end + 1
+
+
+def _scan(pattern, data):
+	"""Yield the matches of pattern in data, searching one block of lines at a time.
+
+	Each search runs two lines past its block so that matches spanning a line break are still found,
+	and only matches starting inside the block are kept.
+	"""
+	pos = 0
+	while pos < len(data):
+		end = _line_end(data, min(pos + SCAN_BLOCK, len(data)))
+		for m in pattern.finditer(data, pos, _line_end(data, _line_end(data, end))):
+			if m.start() >= end:
+				break
+			yield m
+		pos = end
+
+
+def _build_from_paged(lines, marker, lineMarker):
+	data = lines.data
+	headingLines = {lines.line_at(m.start()) for m in _scan(_HEADING_BYTES_RE, data)}
+	headingLines.update(lines.line_at(m.start()) for m in _scan(_SETEXT_BYTES_RE, data))
+	if marker is not None:
+		headingLines.update(lines.line_at(m.start()) for m in _scan(marker, data))
+	if textEncoding.bom_of(data[:4]):
+		# "^" cannot match after the byte order mark, so the first line is checked once it is decoded
+		headingLines.update(i for i in _build_from_lines(lines[:2], lineMarker).headings if i == 0)
+	headings = array("L", sorted(headingLines))
+	paragraphs = array("L", (lines.line_at(m.end()) for m in _scan(_PARAGRAPH_BYTES_RE, data)))
+	return Outline(headings, paragraphs)
+
+
+def build_outline(lines, markerPattern=""):
+	"""Build the outline of a note's lines; an invalid marker pattern is ignored.
+
+	Paged notes are scanned with regular expressions over their raw bytes, so their lines are never
+	decoded one by one.
+	"""
+	if isinstance(lines, noteBuffer.PagedLines):
+		return _build_from_paged(
+			lines, _compile_marker(markerPattern, lines.encoding), _compile_marker(markerPattern)
+		)
+	return _build_from_lines(lines, _compile_marker(markerPattern))
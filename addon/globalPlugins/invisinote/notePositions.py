@@ -0,0 +1,160 @@
+import os
+import json
+import zlib
+
+POSITIONS_VERSION = 1
+# notes whose positions are kept; the ones left longest ago are forgotten first
+MAX_NOTES = 5000
+# lines on either side of a remembered position searched for its line after the note changed
+RELOCATE_WINDOW = 1000
+
+
+def _crc(text):
+	return zlib.crc32(text.encode("utf-8", "replace"))
+
+
+def fingerprint(lines, index):
+	"""Return [crc of the line at index, crc of it with the lines either side], ignoring surrounding spaces.
+
+	The context tells apart repeated lines, such as blank ones or a repeated log message.
+	"""
+	line = lines[index].strip()
+	before = lines[index - 1].strip() if index > 0 else ""
+	after = lines[index + 1].strip() if index + 1 < len(lines) else ""
+	return [_crc(line), _crc("\n".join((before, line, after)))]
+
+
+def relocate(lines, index, lineFingerprint):
+	"""Return where the line remembered at index with lineFingerprint is now, or None for no lines.
+
+	An unchanged note costs one fingerprint. Otherwise the nearest line with the same context is taken,
+	or failing that the nearest line with the same text; a line that is gone keeps its line number,
+	within the note.
+	"""
+	if not lines:
+		return None
+	last = len(lines) - 1
+	if index <= last and fingerprint(lines, index) == lineFingerprint:
+		return index
+	lineCrc, contextCrc = lineFingerprint
+	start = min(index, last)
+	nearest = None
+	for distance in range(RELOCATE_WINDOW + 1):
+		for candidate in (start - distance, start + distance) if distance else (start,):
+			if 0 <= candidate <= last and _crc(lines[candidate].strip()) == lineCrc:
+				if fingerprint(lines, candidate)[1] == contextCrc:
+					return candidate
+				if nearest is None:
+					nearest = candidate
+		if start - distance <= 0 and start + distance >= last:
+			break
+	return nearest if nearest is not None else start
+
+
+def _marker(lines, lineIndex, charIndex):
+	# a remembered place is saved as [line, char, line crc, context crc]
+	return [lineIndex, charIndex] + fingerprint(lines, lineIndex)
+
+
+def _find(lines, marker):
+	lineIndex = relocate(lines, marker[0], marker[2:4])
+	return None if lineIndex is None else (lineIndex, marker[1])
+
+
+class PositionStore:
+	"""Where each note was left, and its named bookmarks, kept in positionsFile between sessions.
+
+	Entries are keyed by note path, so finding a note's position when it is opened is one dictionary
+	lookup plus a fingerprint check of the remembered line.
+	"""
+
+	def __init__(self, positionsFile):
+		self.positionsFile = positionsFile
+		# path -> {"last": marker, "selection": [marker or None, marker or None], "bookmarks": {name: marker}}
+		self._notes = {}
+		self.dirty = False
+
+	def load(self):
+		try:
+			with open(self.positionsFile, "r", encoding="utf-8") as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return
+		if not isinstance(data, dict) or data.get("version") != POSITIONS_VERSION:
+			return
+		notes = data.get("notes")
+		if isinstance(notes, dict):
+			self._notes = notes
+
+	def snapshot(self):
+		"""Return what to save if anything changed since the last snapshot, or None."""
+		if not self.dirty:
+			return None
+		self.dirty = False
+		# entries are replaced rather than changed, so the copy written out only needs the dictionary
+		return {"version": POSITIONS_VERSION, "notes": dict(self._notes)}
+
+	def _entry(self, path):
+		# a note used again moves to the end, so the notes left longest ago come first
+		entry = self._notes.pop(path, None)
+		if entry is None:
+			entry = {"bookmarks": {}}
+			if len(self._notes) >= MAX_NOTES:
+				del self._notes[next(iter(self._notes))]
+		self._notes[path] = entry
+		return entry
+
+	def _replace(self, path, entry, **changes):
+		self._notes[path] = dict(entry, **changes)
+		self.dirty = True
+
+	def remember(self, path, lines, lineIndex, charIndex, selection):
+		"""Record where a note was left, with its selection markers as (line, char) pairs or None."""
+		if not lines:
+			return
+		entry = self._entry(path)
+		last = _marker(lines, lineIndex, charIndex)
+		selection = [
+			_marker(lines, *marker) if marker is not None and marker[0] < len(lines) else None
+			for marker in selection
+		]
+		if entry.get("last") != last or entry.get("selection") != selection:
+			self._replace(path, entry, last=last, selection=selection)
+
+	def last_position(self, path, lines):
+		"""Return ((line, char), [selection start, selection end]) where the note was left, or None."""
+		entry = self._notes.get(path)
+		if entry is None or "last" not in entry or not lines:
+			return None
+		selection = [_find(lines, marker) if marker is not None else None for marker in entry["selection"]]
+		return _find(lines, entry["last"]), selection
+
+	def set_bookmark(self, path, name, lines, lineIndex, charIndex):
+		entry = self._entry(path)
+		marker = _marker(lines, lineIndex, charIndex)
+		if entry["bookmarks"].get(name) != marker:
+			self._replace(path, entry, bookmarks={**entry["bookmarks"], name: marker})
+
+	def bookmarks(self, path):
+		"""Return the names of a note's bookmarks in the order of their remembered lines."""
+		entry = self._notes.get(path)
+		if entry is None:
+			return []
+		marks = entry["bookmarks"]
+		return sorted(marks, key=lambda name: (marks[name][0], marks[name][1], name))
+
+	def find_bookmark(self, path, name, lines):
+		"""Return (line, char) of a bookmark in the note's current lines, or None."""
+		entry = self._notes.get(path)
+		marker = entry["bookmarks"].get(name) if entry is not None else None
+		return _find(lines, marker) if marker is not None else None
+
+
+def save(positionsFile, data):
+	tmpFile = positionsFile + ".tmp"
+	try:
+		with open(tmpFile, "w", encoding="utf-8") as f:
+			json.dump(data, f, separators=(",", ":"))
+		os.replace(tmpFile, positionsFile)
+	except OSError:
+		pass
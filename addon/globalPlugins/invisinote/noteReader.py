@@ -0,0 +1,127 @@
+import re
+
+import wx
+import speech
+from speech.commands import CallbackCommand
+
+# upper bound on the length of one spoken chunk, in characters
+CHUNK_CHARS = 500
+# chunks handed to the synthesizer ahead of the one being spoken
+LOOKAHEAD = 2
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _split_long_text(text, maxChars):
+	"""Yield (offset, piece) pairs splitting text at sentence ends, or at spaces if a sentence is too long."""
+	start = 0
+	while len(text) - start > maxChars:
+		limit = start + maxChars
+		cut = -1
+		for m in _SENTENCE_END_RE.finditer(text, start + 1, limit):
+			cut = m.end()
+		if cut <= start:
+			space = text.rfind(" ", start + 1, limit)
+			cut = space + 1 if space > start else limit
+		yield start, text[start:cut]
+		start = cut
+	yield start, text[start:]
+
+
+def iter_chunks(lines, startLine=0, startChar=0, maxChars=CHUNK_CHARS):
+	"""Yield ((line index, char index), text) chunks of a note, starting at the given position.
+
+	Consecutive lines are grouped into paragraph-sized chunks that end at blank lines; lines longer
+	than maxChars are split at sentence ends. Only the lines being chunked are accessed, so paged
+	notes are never decoded in full.
+	"""
+	parts = []
+	size = 0
+	chunkStart = None
+	for lineIndex in range(startLine, len(lines)):
+		line = lines[lineIndex].rstrip("\r\n")
+		offset = startChar if lineIndex == startLine else 0
+		text = line[offset:]
+		if not text.strip():
+			if parts:
+				yield chunkStart, "\n".join(parts)
+				parts = []
+				size = 0
+			continue
+		if size + len(text) <= maxChars:
+			if not parts:
+				chunkStart = (lineIndex, offset)
+			parts.append(text)
+			size += len(text)
+			continue
+		if parts:
+			yield chunkStart, "\n".join(parts)
+		pieces = list(_split_long_text(text, maxChars))
+		for pieceStart, piece in pieces[:-1]:
+			yield (lineIndex, offset + pieceStart), piece
+		pieceStart, piece = pieces[-1]
+		chunkStart = (lineIndex, offset + pieceStart)
+		parts = [piece]
+		size = len(piece)
+	if parts:
+		yield chunkStart, "\n".join(parts)
+
+
+class NoteReader:
+	"""Speaks a note chunk by chunk, keeping only a few chunks queued in the synthesizer.
+
+	A callback placed before each chunk records where speech has got to and queues the next chunk, so
+	when speech is interrupted the reader simply stops being fed and position holds the start of the
+	chunk that was being spoken.
+	"""
+
+	def __init__(self):
+		self.path = None
+		self.position = None
+		self._chunks = None
+		self._queued = 0
+		self._generation = 0
+
+	def start(self, path, lines, startLine=0, startChar=0):
+		"""Start reading; returns False if there is nothing to read from that position."""
+		self._generation += 1
+		self.path = path
+		self._chunks = iter_chunks(lines, startLine, startChar)
+		self._queued = 0
+		self.position = (startLine, startChar)
+		if not self._feed(self._generation):
+			self.position = None
+			return False
+		return True
+
+	def stop(self):
+		self._generation += 1
+		self._chunks = None
+
+	def _feed(self, generation):
+		queuedAny = False
+		while self._chunks is not None and self._queued < LOOKAHEAD:
+			chunk = next(self._chunks, None)
+			if chunk is None:
+				self._chunks = None
+				speech.speak([CallbackCommand(lambda: wx.CallAfter(self._on_finished, generation))])
+				break
+			position, text = chunk
+			self._queued += 1
+			queuedAny = True
+			callback = CallbackCommand(
+				lambda position=position: wx.CallAfter(self._on_chunk, generation, position)
+			)
+			speech.speak([callback, text])
+		return queuedAny
+
+	def _on_chunk(self, generation, position):
+		if generation != self._generation:
+			return
+		self.position = position
+		self._queued -= 1
+		self._feed(generation)
+
+	def _on_finished(self, generation):
+		if generation == self._generation:
+			self.position = None
@@ -0,0 +1,50 @@
+import os
+import re
+
+# the orders notes can be browsed in, in the order the sort gesture steps through them
+SORT_MODES = ("name", "natural", "modified", "created", "size")
+# which field of a (mtime_ns, size, created_ns) stat the time and size modes sort on, largest first
+_STAT_FIELDS = {"modified": 0, "size": 1, "created": 2}
+
+_DIGITS_RE = re.compile(r"(\d+)")
+
+
+def natural_key(name):
+	"""Sort key that orders the numbers in a name by value, so "note2" comes before "note10"."""
+	parts = _DIGITS_RE.split(name.lower())
+	# split puts the numbers at odd positions, so keys compare text with text and numbers with numbers
+	parts[1::2] = [int(part) for part in parts[1::2]]
+	return parts
+
+
+def needs_stats(mode):
+	return mode in _STAT_FIELDS
+
+
+def sort_notes(notes, mode, stats=None, grouped=True):
+	"""Return a listing of notes in name order, as a new list in sort mode, or notes itself for "name".
+
+	stats maps paths to (mtime_ns, size, created_ns) for the time and size modes, which put the newest
+	or largest notes first and notes without a stat last. In natural order the notes of each folder
+	stay together, in the order the folders first appear, unless grouped is False.
+	"""
+	if mode == "natural":
+		if not grouped:
+			return sorted(notes, key=lambda path: natural_key(os.path.basename(path)))
+		folders = {}
+
+		def key(path):
+			folder, name = os.path.split(path)
+			return folders.setdefault(folder, len(folders)), natural_key(name)
+
+		return sorted(notes, key=key)
+	field = _STAT_FIELDS.get(mode)
+	if field is None:
+		return notes
+
+	def key(path):
+		stat = stats.get(path)
+		return (0, -stat[field]) if stat is not None else (1, 0)
+
+	# sorting is stable, so notes with the same key keep their name order
+	return sorted(notes, key=key)
@@ -0,0 +1,52 @@
+import queue
+import threading
+
+
+class NotePrefetcher:
+	"""Warms the note cache with the notes around the current one on a worker thread.
+
+	warm is called with each path to load; it is expected to store the result somewhere the gesture
+	handlers look first, such as the note cache. Every call to schedule starts a new generation, and
+	work belonging to an older generation is dropped as soon as the worker notices.
+	"""
+
+	def __init__(self, warm):
+		self._warm = warm
+		self._lock = threading.Lock()
+		self._generation = 0
+		self._queue = queue.Queue()
+		self._thread = threading.Thread(target=self._run, name="invisinote prefetch", daemon=True)
+		self._thread.start()
+
+	def schedule(self, paths):
+		"""Prefetch paths in order, abandoning any earlier request."""
+		with self._lock:
+			self._generation += 1
+			generation = self._generation
+		if paths:
+			self._queue.put((generation, list(paths)))
+
+	def cancel(self):
+		self.schedule([])
+
+	def stop(self):
+		self.cancel()
+		self._queue.put(None)
+
+	def _is_current(self, generation):
+		with self._lock:
+			return generation == self._generation
+
+	def _run(self):
+		while True:
+			job = self._queue.get()
+			if job is None:
+				return
+			generation, paths = job
+			for path in paths:
+				if not self._is_current(generation):
+					break
+				try:
+					self._warm(path)
+				except OSError:
+					continue
@@ -0,0 +1,138 @@
+import re
+from array import array
+
+from . import backgroundRefresh
+from . import noteBuffer
+
+_TERM_RE = re.compile(r"\w+")
+# postings pack a note id and a line number into one unsigned 64 bit value
+_LINE_BITS = 32
+_LINE_MASK = (1 << _LINE_BITS) - 1
+
+
+def terms(text):
+	return _TERM_RE.findall(text.lower())
+
+
+class SearchIndex(backgroundRefresh.BackgroundRefresh):
+	"""Inverted index from lowercased words to the note lines that contain them.
+
+	The index is built and refreshed on a background thread. A refresh only reads notes whose mtime or
+	size changed since they were last indexed; a changed or removed note's old id is retired rather
+	than scrubbed from every posting list, and retired ids are filtered out of query results. Notes
+	large enough to be paged are not indexed.
+	"""
+
+	threadName = "invisinote search index"
+
+	def __init__(self, listNotes, readText, noteStamps):
+		super().__init__(listNotes, noteStamps)
+		self._readText = readText
+		self._postings = {}
+		# note id -> path, or None once the id has been retired
+		self._paths = []
+		# path -> (note id, (mtime_ns, size))
+		self._notes = {}
+		self._live = 0
+		self.ready = False
+
+	def _update(self, folders, fileFilter):
+		changed = super()._update(folders, fileFilter)
+		self.ready = True
+		return changed
+
+	def _known_stamp(self, path):
+		known = self._notes.get(path)
+		return known[1] if known is not None else None
+
+	def _note_changed(self, path, stamp):
+		if stamp[1] >= noteBuffer.PAGED_THRESHOLD:
+			self._retire(path)
+			return True
+		try:
+			text = self._readText(path, stamp)
+		except OSError:
+			return False
+		self._add(path, stamp, text)
+		return True
+
+	def _notes_removed(self, seen):
+		removed = [path for path in self._notes if path not in seen]
+		for path in removed:
+			self._retire(path)
+		if len(self._paths) > 2 * self._live + 1024:
+			self._compact()
+		return bool(removed)
+
+	def _add(self, path, stamp, text):
+		lineTerms = [(lineNo, set(terms(line))) for lineNo, line in enumerate(text.splitlines())]
+		with self._lock:
+			self._retire_locked(path)
+			noteId = len(self._paths)
+			self._paths.append(path)
+			self._notes[path] = (noteId, stamp)
+			self._live += 1
+			base = noteId << _LINE_BITS
+			postings = self._postings
+			for lineNo, words in lineTerms:
+				for word in words:
+					posting = postings.get(word)
+					if posting is None:
+						posting = postings[word] = array("Q")
+					posting.append(base | lineNo)
+
+	def _retire(self, path):
+		with self._lock:
+			self._retire_locked(path)
+
+	def _retire_locked(self, path):
+		known = self._notes.pop(path, None)
+		if known is not None:
+			self._paths[known[0]] = None
+			self._live -= 1
+
+	def _compact(self):
+		with self._lock:
+			remap = {}
+			paths = []
+			for oldId, path in enumerate(self._paths):
+				if path is not None:
+					remap[oldId] = len(paths)
+					paths.append(path)
+			postings = {}
+			for word, posting in self._postings.items():
+				kept = array(
+					"Q",
+					(
+						remap[value >> _LINE_BITS] << _LINE_BITS | (value & _LINE_MASK)
+						for value in posting
+						if (value >> _LINE_BITS) in remap
+					),
+				)
+				if kept:
+					postings[word] = kept
+			self._postings = postings
+			self._paths = paths
+			self._notes = {path: (remap[noteId], stamp) for path, (noteId, stamp) in self._notes.items()}
+
+	def search(self, query):
+		"""Return sorted (path, line index) pairs for the lines containing every word of query."""
+		words = set(terms(query))
+		if not words:
+			return []
+		with self._lock:
+			postings = sorted((self._postings.get(word, ()) for word in words), key=len)
+			if not postings[0]:
+				return []
+			hits = set(postings[0])
+			for posting in postings[1:]:
+				hits.intersection_update(posting)
+				if not hits:
+					return []
+			results = []
+			for value in hits:
+				path = self._paths[value >> _LINE_BITS]
+				if path is not None:
+					results.append((path, value & _LINE_MASK))
+		results.sort()
+		return results
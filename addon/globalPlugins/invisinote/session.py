@@ -0,0 +1,27 @@
+import os
+import json
+
+SESSION_VERSION = 1
+
+
+def load(sessionFile):
+	"""Return the saved session snapshot, or None if there is none or it cannot be read."""
+	try:
+		with open(sessionFile, "r", encoding="utf-8") as f:
+			data = json.load(f)
+	except (OSError, ValueError):
+		return None
+	if not isinstance(data, dict) or data.get("version") != SESSION_VERSION:
+		return None
+	return data
+
+
+def save(sessionFile, data):
+	data = dict(data, version=SESSION_VERSION)
+	tmpFile = sessionFile + ".tmp"
+	try:
+		with open(tmpFile, "w", encoding="utf-8") as f:
+			json.dump(data, f)
+		os.replace(tmpFile, sessionFile)
+	except OSError:
+		pass
@@ -0,0 +1,55 @@
+import itertools
+from collections import OrderedDict
+
+
+class SymbolCache:
+	"""Spoken forms of single characters, as rendered by NVDA's speech symbol processing.
+
+	Renderings are keyed by (language, character) and the least recently used are dropped past
+	maxSize. A change of NVDA language empties the cache, since the symbol dictionaries behind the
+	renderings change with it.
+	"""
+
+	def __init__(self, render, maxSize=2048):
+		# render(language, char), such as characterProcessing.processSpeechSymbol
+		self._render = render
+		self.maxSize = maxSize
+		self.language = None
+		self._entries = OrderedDict()
+		self._precomputed = None
+
+	def _use_language(self, language):
+		if language != self.language:
+			self.language = language
+			self._entries.clear()
+			self._precomputed = None
+
+	def get(self, language, char):
+		self._use_language(language)
+		key = (language, char)
+		text = self._entries.get(key)
+		if text is not None:
+			self._entries.move_to_end(key)
+			return text
+		text = self._render(language, char)
+		self._entries[key] = text
+		if len(self._entries) > self.maxSize:
+			self._entries.popitem(last=False)
+		return text
+
+	def is_precomputed(self, language, line):
+		return line is self._precomputed and language == self.language
+
+	def precompute(self, language, line):
+		"""Render the distinct characters of line ahead of moving along it, once per line."""
+		if self.is_precomputed(language, line):
+			return
+		self._use_language(language)
+		self._precomputed = line
+		# a line of more distinct characters than half the cache would only push its own out again
+		for char in itertools.islice(set(line), self.maxSize // 2):
+			self.get(language, char)
+
+	def clear(self):
+		self._entries.clear()
+		self._precomputed = None
@@ -0,0 +1,74 @@
+import codecs
+
+# bytes sampled from the start of a file to guess its encoding
+SAMPLE_SIZE = 64 * 1024
+FALLBACK_ENCODING = "latin-1"
+
+_BOMS = (
+	# UTF-32 first, as its little-endian BOM starts with the UTF-16 one
+	(codecs.BOM_UTF32_LE, "utf-32"),
+	(codecs.BOM_UTF32_BE, "utf-32"),
+	(codecs.BOM_UTF8, "utf-8-sig"),
+	(codecs.BOM_UTF16_LE, "utf-16"),
+	(codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect(sample):
+	"""Guess the encoding of a file from the first bytes of it."""
+	for bom, encoding in _BOMS:
+		if sample.startswith(bom):
+			return encoding
+	if sample:
+		# BOM-less UTF-16, as written by some Windows tools: mostly ASCII with a NUL in every other byte
+		evenNuls = sample[0::2].count(0)
+		oddNuls = sample[1::2].count(0)
+		half = len(sample) // 2
+		if oddNuls > half * 0.3 and evenNuls < half * 0.05:
+			return "utf-16-le"
+		if evenNuls > half * 0.3 and oddNuls < half * 0.05:
+			return "utf-16-be"
+	try:
+		# not final, so a multibyte character cut off at the end of the sample is not an error
+		codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+	except UnicodeDecodeError:
+		return FALLBACK_ENCODING
+	return "utf-8"
+
+
+def bom_of(sample):
+	"""Return the byte order mark sample starts with, or b"" if it has none."""
+	for bom, _encoding in _BOMS:
+		if sample.startswith(bom):
+			return bom
+	return b""
+
+
+def is_ascii_compatible(encoding):
+	"""Whether a line break is a single 0x0A byte in this encoding, so lines can be split as bytes."""
+	return not codecs.lookup(encoding).name.startswith(("utf-16", "utf-32"))
+
+
+def sniff_file(path):
+	with open(path, "rb") as f:
+		return detect(f.read(SAMPLE_SIZE))
+
+
+def read_text(path, encoding=None):
+	"""Read and decode a file with a single read, returning (text, encoding).
+
+	The encoding is detected from the head of the file unless it is given. If the file turns out not to
+	be valid UTF-8 past the sampled head, the bytes already read are decoded with the fallback encoding.
+	"""
+	with open(path, "rb") as f:
+		return decode(f.read(), encoding)
+
+
+def decode(data, encoding=None):
+	"""Decode the bytes of a whole note like read_text, returning (text, encoding)."""
+	if encoding is None:
+		encoding = detect(data[:SAMPLE_SIZE])
+	try:
+		return data.decode(encoding), encoding
+	except (UnicodeDecodeError, LookupError):
+		return data.decode(FALLBACK_ENCODING), FALLBACK_ENCODING
@@ -0,0 +1,99 @@
+import time
+import threading
+import functools
+from collections import deque
+
+# helpers doing file I/O that are timed alongside the scripts
+IO_HELPERS = ("_load_notes", "_scan_folder", "_scan_all_folders", "_get_note_lines", "_read_note_file")
+
+
+def _percentile(sortedValues, fraction):
+	index = min(len(sortedValues) - 1, max(0, int(round(fraction * len(sortedValues))) - 1))
+	return sortedValues[index]
+
+
+class Tracer:
+	"""Times calls to an object's scripts and I/O helpers into a ring buffer.
+
+	Enabling wraps the methods with instance attributes and disabling removes them again, so nothing is
+	timed, and nothing costs anything, while tracing is off. Each record holds the call name, its wall
+	time and the bytes read and note cache hits and misses counted during the call on its thread.
+	"""
+
+	def __init__(self, size=4096):
+		self.enabled = False
+		self.records = deque(maxlen=size)
+		self._local = threading.local()
+		self._wrapped = []
+
+	def enable(self, obj):
+		names = [name for name in dir(type(obj)) if name.startswith("script_")]
+		names.extend(name for name in IO_HELPERS if hasattr(obj, name))
+		for name in names:
+			setattr(obj, name, self._wrap(name, getattr(obj, name)))
+		self._wrapped = names
+		self.enabled = True
+
+	def disable(self, obj):
+		for name in self._wrapped:
+			obj.__dict__.pop(name, None)
+		self._wrapped = []
+		self.enabled = False
+
+	def _wrap(self, name, func):
+		local = self._local
+		records = self.records
+
+		@functools.wraps(func)
+		def traced(*args, **kwargs):
+			outer = getattr(local, "counters", None)
+			counters = local.counters = [0, 0, 0]
+			start = time.perf_counter()
+			try:
+				return func(*args, **kwargs)
+			finally:
+				records.append((name, time.perf_counter() - start, counters[0], counters[1], counters[2]))
+				if outer is not None:
+					for i, value in enumerate(counters):
+						outer[i] += value
+				local.counters = outer
+
+		return traced
+
+	def count_bytes(self, count):
+		counters = getattr(self._local, "counters", None)
+		if counters is not None:
+			counters[0] += count
+
+	def count_cache(self, hit):
+		counters = getattr(self._local, "counters", None)
+		if counters is not None:
+			counters[1 if hit else 2] += 1
+
+	def summary(self):
+		"""Return (name, calls, p50, p90, max seconds, bytes, hits, misses) rows, slowest p90 first."""
+		byName = {}
+		for name, elapsed, byteCount, hits, misses in list(self.records):
+			entry = byName.setdefault(name, [[], 0, 0, 0])
+			entry[0].append(elapsed)
+			entry[1] += byteCount
+			entry[2] += hits
+			entry[3] += misses
+		rows = []
+		for name, (times, byteCount, hits, misses) in byName.items():
+			times.sort()
+			p50 = _percentile(times, 0.5)
+			p90 = _percentile(times, 0.9)
+			rows.append((name, len(times), p50, p90, times[-1], byteCount, hits, misses))
+		rows.sort(key=lambda row: row[3], reverse=True)
+		return rows
+
+	def format_summary(self):
+		lines = ["name\tcalls\tp50 ms\tp90 ms\tmax ms\tbytes read\tcache hits\tcache misses"]
+		for name, calls, p50, p90, worst, byteCount, hits, misses in self.summary():
+			lines.append(
+				"{}\t{}\t{:.2f}\t{:.2f}\t{:.2f}\t{}\t{}\t{}".format(
+					name, calls, p50 * 1000, p90 * 1000, worst * 1000, byteCount, hits, misses
+				)
+			)
+		return "\n".join(lines)
@@ -0,0 +1,63 @@
+import re
+import bisect
+from array import array
+from collections import OrderedDict
+
+_WORD_RE = re.compile(r"\S+")
+
+
+class LineWords:
+	"""Start and end offsets of the whitespace-separated words of one line, searchable with bisect."""
+
+	def __init__(self, line):
+		self.line = line
+		self.starts = array("L")
+		self.ends = array("L")
+		for m in _WORD_RE.finditer(line):
+			self.starts.append(m.start())
+			self.ends.append(m.end())
+
+	def __len__(self):
+		return len(self.starts)
+
+	def word(self, index):
+		return self.line[self.starts[index] : self.ends[index]]
+
+	def index_at(self, charIndex):
+		"""Index of the word containing charIndex, or None if it falls between words."""
+		i = bisect.bisect_right(self.starts, charIndex) - 1
+		if i >= 0 and charIndex < self.ends[i]:
+			return i
+		return None
+
+	def next_after(self, charIndex):
+		"""Index of the first word starting after charIndex, or None."""
+		i = bisect.bisect_right(self.starts, charIndex)
+		return i if i < len(self.starts) else None
+
+	def previous_before(self, charIndex):
+		"""Index of the last word starting before charIndex, or None."""
+		i = bisect.bisect_left(self.starts, charIndex) - 1
+		return i if i >= 0 else None
+
+
+class LineWordsCache:
+	"""Word offsets of the most recently visited lines of the current note."""
+
+	def __init__(self, maxLines=64):
+		self.maxLines = maxLines
+		self._lines = OrderedDict()
+
+	def get(self, lineIndex, line):
+		words = self._lines.get(lineIndex)
+		if words is not None and words.line is line:
+			self._lines.move_to_end(lineIndex)
+			return words
+		words = LineWords(line)
+		self._lines[lineIndex] = words
+		if len(self._lines) > self.maxLines:
+			self._lines.popitem(last=False)
+		return words
+
+	def clear(self):
+		self._lines.clear()
@@ -0,0 +1,69 @@
+"""Synthetic note folders for the benchmarks."""
+
+import os
+import random
+
+WORDS = (
+	"alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu nu xi omicron pi rho sigma tau "
+	"upsilon phi chi psi omega note folder line word character selection index cache speech"
+).split()
+
+
+def _sentence(rng, words):
+	return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_small_notes(folder, count, rng):
+	"""Many short notes of a few paragraphs each."""
+	os.makedirs(folder, exist_ok=True)
+	for i in range(count):
+		paragraphs = []
+		for _ in range(rng.randint(1, 4)):
+			paragraphs.append("\n".join(_sentence(rng, rng.randint(4, 14)) for _ in range(rng.randint(1, 5))))
+		with open(os.path.join(folder, "note{}.txt".format(i)), "w", encoding="utf-8") as f:
+			f.write("# Note {}\n\n".format(i) + "\n\n".join(paragraphs) + "\n")
+
+
+def make_huge_notes(folder, count, megabytes, rng):
+	"""A few log-like notes of the given size, large enough to be paged."""
+	os.makedirs(folder, exist_ok=True)
+	for i in range(count):
+		target = megabytes * 1024 * 1024
+		written = 0
+		lineNo = 0
+		with open(os.path.join(folder, "log{}.txt".format(i)), "w", encoding="utf-8") as f:
+			while written < target:
+				line = "2026-01-01 00:{:02d}:{:02d} INFO {} {}\n".format(
+					lineNo // 60 % 60, lineNo % 60, lineNo, _sentence(rng, rng.randint(3, 20))
+				)
+				f.write(line)
+				written += len(line)
+				lineNo += 1
+
+
+def make_long_line_notes(folder, count, kilobytes, rng):
+	"""Notes made of a single very long line, like minified JSON or CSV exports."""
+	os.makedirs(folder, exist_ok=True)
+	for i in range(count):
+		cells = []
+		size = 0
+		while size < kilobytes * 1024:
+			cell = rng.choice(WORDS) + str(rng.randint(0, 99999))
+			cells.append(cell)
+			size += len(cell) + 1
+		with open(os.path.join(folder, "wide{}.csv.txt".format(i)), "w", encoding="utf-8") as f:
+			f.write(",".join(cells) + "\n")
+
+
+def make_corpus(root, smallCount=2000, hugeCount=2, hugeMegabytes=16, wideCount=2, wideKilobytes=512, seed=1):
+	"""Create the three benchmark folders under root and return their paths."""
+	rng = random.Random(seed)
+	folders = {
+		"small": os.path.join(root, "small"),
+		"huge": os.path.join(root, "huge"),
+		"wide": os.path.join(root, "wide"),
+	}
+	make_small_notes(folders["small"], smallCount, rng)
+	make_huge_notes(folders["huge"], hugeCount, hugeMegabytes, rng)
+	make_long_line_notes(folders["wide"], wideCount, wideKilobytes, rng)
+	return folders
@@ -0,0 +1,182 @@
+"""Headless latency and memory benchmarks for invisinote.
+
+Run from the repository root:
+
+	python benchmarks/run.py
+
+NVDA's modules are replaced by the stand-ins in benchmarks/stubs, a synthetic corpus is generated in
+a temporary folder and GlobalPlugin scripts are called directly. Work handed to background tasks is
+waited for, so a gesture's latency runs until its result has been announced. Peak memory is the
+Python heap measured by tracemalloc; memory-mapped note files are not included.
+"""
+
+import argparse
+import builtins
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "stubs"), os.path.join(HERE, "..", "addon", "globalPlugins")]
+builtins._ = lambda text: text
+
+import corpus  # noqa: E402
+import globalVars  # noqa: E402
+import wx  # noqa: E402
+
+
+def percentile(sortedSamples, fraction):
+	index = min(len(sortedSamples) - 1, max(0, int(round(fraction * len(sortedSamples))) - 1))
+	return sortedSamples[index]
+
+
+class Bench:
+	def __init__(self, plugin):
+		self.plugin = plugin
+		self.samples = {}
+		self.memory = {}
+
+	def wait(self, timeout=120):
+		"""Pump CallAfter calls until no background task is outstanding."""
+		deadline = time.perf_counter() + timeout
+		while True:
+			wx.pump()
+			if not self.plugin.tasks.busy() and not wx.pending():
+				return
+			if time.perf_counter() > deadline:
+				raise RuntimeError("background tasks did not finish")
+			time.sleep(0.0002)
+
+	def gesture(self, name, func, *args):
+		start = time.perf_counter()
+		result = func(*args)
+		self.wait()
+		self.samples.setdefault(name, []).append(time.perf_counter() - start)
+		return result
+
+	def script(self, name, times=1):
+		func = getattr(self.plugin, "script_" + name)
+		for _i in range(times):
+			self.gesture(name, func, None)
+
+	def scenario(self, name, body):
+		tracemalloc.start()
+		try:
+			body(self)
+			self.memory[name] = tracemalloc.get_traced_memory()[1]
+		finally:
+			tracemalloc.stop()
+
+	def report(self):
+		header = ("gesture", "count", "p50 ms", "p90 ms", "p99 ms", "max ms")
+		lines = ["{:<28}{:>7}{:>10}{:>10}{:>10}{:>10}".format(*header)]
+		for name, samples in self.samples.items():
+			samples = sorted(samples)
+			lines.append(
+				"{:<28}{:>7}{:>10.3f}{:>10.3f}{:>10.3f}{:>10.3f}".format(
+					name,
+					len(samples),
+					percentile(samples, 0.5) * 1000,
+					percentile(samples, 0.9) * 1000,
+					percentile(samples, 0.99) * 1000,
+					samples[-1] * 1000,
+				)
+			)
+		lines.append("")
+		lines.append("{:<28}{:>17}".format("scenario", "peak heap MB"))
+		for name, peak in self.memory.items():
+			lines.append("{:<28}{:>17.1f}".format(name, peak / (1024 * 1024)))
+		return "\n".join(lines)
+
+
+def small_notes(repeat):
+	def body(bench):
+		plugin = bench.plugin
+		bench.gesture("load_notes (cold)", plugin.script_load_notes, None)
+		bench.script("load_notes", repeat // 10 or 1)
+		bench.script("next_note", min(repeat, len(plugin.notes) - 1))
+		bench.script("previous_note", min(repeat, plugin.currentNoteIndex))
+		bench.script("next_line", 3)
+
+	return body
+
+
+def huge_notes(repeat):
+	def body(bench):
+		plugin = bench.plugin
+		bench.script("next_folder")
+		bench.script("next_line", repeat)
+		bench.script("previous_line", repeat // 2)
+		bench.script("next_note")
+		bench.script("previous_note")
+		plugin.selectionStart = (0, 0)
+		plugin.selectionEnd = (min(1000, len(plugin.currentNoteLines) - 1), 5)
+		for _i in range(repeat // 10 or 1):
+			bench.gesture("_selection_text (1000 lines)", plugin._selection_text)
+
+	return body
+
+
+def long_lines(repeat):
+	def body(bench):
+		bench.script("next_folder")
+		bench.script("next_word", repeat)
+		bench.script("previous_word", repeat // 2)
+		bench.script("next_character", repeat)
+		bench.script("previous_character", repeat // 2)
+		bench.script("end_of_line", 10)
+		bench.script("start_of_line", 10)
+
+	return body
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--small", type=int, default=2000, help="number of small notes")
+	parser.add_argument("--huge", type=int, default=2, help="number of huge notes")
+	parser.add_argument("--huge-mb", type=int, default=16, help="size of each huge note in megabytes")
+	parser.add_argument("--wide", type=int, default=2, help="number of single-line notes")
+	parser.add_argument("--wide-kb", type=int, default=512, help="length of each single line in kilobytes")
+	parser.add_argument("--repeat", type=int, default=200, help="presses per navigation gesture")
+	parser.add_argument("--output", help="also write the report to this file")
+	parser.add_argument("--keep", action="store_true", help="keep the generated corpus and config folder")
+	args = parser.parse_args()
+
+	root = tempfile.mkdtemp(prefix="invisinote-bench-")
+	try:
+		folders = corpus.make_corpus(root, args.small, args.huge, args.huge_mb, args.wide, args.wide_kb)
+		globalVars.appArgs.configPath = os.path.join(root, "config")
+		configFolder = os.path.join(globalVars.appArgs.configPath, "invisinote")
+		os.makedirs(configFolder)
+		with open(os.path.join(configFolder, "paths.txt"), "w", encoding="utf-8") as f:
+			f.write("\n".join([folders["small"], folders["huge"], folders["wide"]]) + "\n")
+
+		import invisinote
+
+		plugin = invisinote.GlobalPlugin()
+		bench = Bench(plugin)
+		# NVDA starts the plugin on the first invisinote gesture
+		bench.gesture("first gesture (startup)", plugin._ensure_started)
+		try:
+			bench.scenario("small notes", small_notes(args.repeat))
+			bench.scenario("huge notes", huge_notes(args.repeat))
+			bench.scenario("long lines", long_lines(args.repeat))
+		finally:
+			plugin.terminate()
+		report = bench.report()
+		print(report)
+		if args.output:
+			with open(args.output, "w", encoding="utf-8") as f:
+				f.write(report + "\n")
+	finally:
+		if args.keep:
+			print("corpus kept in " + root)
+		else:
+			shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+	main()
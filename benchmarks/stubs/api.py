@@ -0,0 +1,9 @@
+"""Stand-in for NVDA's api module."""
+
+clipboard = None
+
+
+def copyToClip(text, *args, **kwargs):
+	global clipboard
+	clipboard = text
+	return True
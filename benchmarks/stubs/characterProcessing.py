@@ -0,0 +1,5 @@
+"""Stand-in for NVDA's characterProcessing."""
+
+
+def processSpeechSymbol(locale, symbol):
+	return symbol
@@ -0,0 +1,5 @@
+"""Stand-in for NVDA's globalVars; the benchmark points configPath at a temporary folder."""
+
+import types
+
+appArgs = types.SimpleNamespace(configPath="")
@@ -0,0 +1,3 @@
+"""Stand-in for NVDA's gui module."""
+
+mainFrame = None
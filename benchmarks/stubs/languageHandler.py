@@ -0,0 +1,5 @@
+"""Stand-in for NVDA's languageHandler."""
+
+
+def getLanguage():
+	return "en"
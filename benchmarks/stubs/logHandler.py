@@ -0,0 +1,5 @@
+"""Stand-in for NVDA's logHandler."""
+
+import logging
+
+log = logging.getLogger("nvda")
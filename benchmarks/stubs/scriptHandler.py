@@ -0,0 +1,15 @@
+"""Stand-in for NVDA's scriptHandler."""
+
+repeatCount = 0
+
+
+def getLastScriptRepeatCount():
+	return repeatCount
+
+
+def script(description=None, gesture=None, gestures=None, category=None, **kwargs):
+	def decorator(func):
+		func.__doc__ = description
+		return func
+
+	return decorator
@@ -0,0 +1,11 @@
+"""Stand-in for NVDA's speech package; speech sequences are recorded, not spoken."""
+
+spoken = []
+
+
+def speak(speechSequence, *args, **kwargs):
+	spoken.append(speechSequence)
+
+
+def cancelSpeech():
+	spoken.clear()
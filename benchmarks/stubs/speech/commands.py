@@ -0,0 +1,9 @@
+"""Stand-in for NVDA's speech.commands."""
+
+
+class CallbackCommand:
+	def __init__(self, callback, name=None):
+		self._callback = callback
+
+	def run(self):
+		self._callback()
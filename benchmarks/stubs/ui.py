@@ -0,0 +1,7 @@
+"""Stand-in for NVDA's ui module that records spoken messages."""
+
+messages = []
+
+
+def message(text, *args, **kwargs):
+	messages.append(text)
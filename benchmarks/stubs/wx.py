@@ -0,0 +1,50 @@
+"""Stand-in for wxPython with a manually pumped CallAfter queue.
+
+Only what invisinote touches at import time and from background tasks is provided; any other
+attribute resolves to a do-nothing class so that dialog code can be imported but not shown.
+"""
+
+import threading
+
+ID_OK = 5100
+ID_CANCEL = 5101
+ID_YES = 5103
+NOT_FOUND = -1
+
+_pending = []
+_lock = threading.Lock()
+
+
+class _Dummy:
+	def __init__(self, *args, **kwargs):
+		pass
+
+	def __getattr__(self, name):
+		return lambda *args, **kwargs: None
+
+
+Dialog = _Dummy
+
+
+def CallAfter(func, *args, **kwargs):
+	with _lock:
+		_pending.append((func, args, kwargs))
+
+
+def pending():
+	with _lock:
+		return len(_pending)
+
+
+def pump():
+	"""Run the queued CallAfter calls, as the wx main loop would."""
+	while True:
+		with _lock:
+			if not _pending:
+				return
+			func, args, kwargs = _pending.pop(0)
+		func(*args, **kwargs)
+
+
+def __getattr__(name):
+	return _Dummy
@@ -30,10 +30,18 @@ addon_info = {
 - NVDA+ALT+[: previous folder
 - NVDA+ALT+]: next folder
 - NVDA+ALT+N: load notes
+- NVDA+ALT+SHIFT+N: browse the notes of all folders together, or only the current note's folder
 - NVDA+ALT+U: previous note
 - NVDA+ALT+O: next note
+- NVDA+ALT+SHIFT+O: jump to note by name
+- NVDA+ALT+S: sort notes by name, by name with numbers in order, by newest modified or created, or by size
 - NVDA+ALT+I: previous line
 - NVDA+ALT+K: next line
+- NVDA+ALT+SHIFT+I: previous heading
+- NVDA+ALT+SHIFT+K: next heading
+- NVDA+ALT+PAGEUP: previous paragraph
+- NVDA+ALT+PAGEDOWN: next paragraph
+- NVDA+ALT+SHIFT+L: go to line number or percentage
 - NVDA+ALT+J: previous word
 - NVDA+ALT+L: next word
 - NVDA+ALT+,: previous character
@@ -41,11 +49,23 @@ addon_info = {
 - NVDA+ALT+H: start of line
 - NVDA+ALT+': end of line
 - NVDA+ALT+SHIFT+A: read note
+- NVDA+ALT+SHIFT+R: resume reading where speech stopped
+- NVDA+ALT+SHIFT+S: report the line and word counts, size, encoding and first heading of the current note
 - NVDA+ALT+A: copy note
 - NVDA+ALT+;: copy line
 - NVDA+ALT+F9: set selection start
 - NVDA+ALT+F10: set selection end, twice to copy
 - NVDA+ALT+BACKSPACE: clear markers
+- NVDA+ALT+B: set a named bookmark at the current position
+- NVDA+ALT+SHIFT+B: jump to a bookmark of the current note
+- NVDA+ALT+SHIFT+F: follow the current note, adding lines appended to it as it grows
+- NVDA+ALT+E: read lines appended to the current note
+- NVDA+ALT+F: search all folders
+- NVDA+ALT+G: next search result
+- NVDA+ALT+SHIFT+G: previous search result
+- NVDA+ALT+R: find a regular expression in all folders, with the matches browsed like search results
+- NVDA+ALT+SHIFT+T: toggle timing of gestures
+- NVDA+ALT+T: report gesture timings
 """),
 	# version
 	"addon_version": "1.6",